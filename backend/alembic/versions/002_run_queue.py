@@ -0,0 +1,27 @@
+"""Run queue columns and index
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('crew_runs', sa.Column('started_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('crew_runs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_crew_runs_status_created_at', 'crew_runs', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_crew_runs_status_created_at', table_name='crew_runs')
+    op.drop_column('crew_runs', 'heartbeat_at')
+    op.drop_column('crew_runs', 'started_at')
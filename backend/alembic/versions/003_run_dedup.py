@@ -0,0 +1,36 @@
+"""Idempotency keys and input memoization for crew runs
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('crews', sa.Column('memoize_ttl_seconds', sa.Integer(), nullable=True))
+    op.add_column('crew_runs', sa.Column('inputs_hash', sa.String(length=64), nullable=True))
+    op.add_column('crew_runs', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    op.add_column('crew_runs', sa.Column('memoized_from_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key('fk_crew_runs_memoized_from_id', 'crew_runs', 'crew_runs', ['memoized_from_id'], ['id'])
+    op.create_index('ix_crew_runs_user_id_idempotency_key', 'crew_runs', ['user_id', 'idempotency_key'], unique=True)
+    op.create_index('ix_crew_runs_crew_id_inputs_hash', 'crew_runs', ['crew_id', 'inputs_hash', 'completed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_crew_runs_crew_id_inputs_hash', table_name='crew_runs')
+    op.drop_index('ix_crew_runs_user_id_idempotency_key', table_name='crew_runs')
+    op.drop_constraint('fk_crew_runs_memoized_from_id', 'crew_runs', type_='foreignkey')
+    op.drop_column('crew_runs', 'memoized_from_id')
+    op.drop_column('crew_runs', 'idempotency_key')
+    op.drop_column('crew_runs', 'inputs_hash')
+    op.drop_column('crews', 'memoize_ttl_seconds')
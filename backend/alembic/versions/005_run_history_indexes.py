@@ -0,0 +1,30 @@
+"""Run history indexes
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-03-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_crew_runs_user_id_created_at_id', 'crew_runs', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_crew_runs_user_id_crew_id_created_at_id', 'crew_runs', ['user_id', 'crew_id', 'created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_crew_runs_user_id_active', 'crew_runs', ['user_id', 'created_at', 'id'], unique=False,
+        postgresql_where=sa.text("status IN ('PENDING', 'RUNNING')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_crew_runs_user_id_active', table_name='crew_runs')
+    op.drop_index('ix_crew_runs_user_id_crew_id_created_at_id', table_name='crew_runs')
+    op.drop_index('ix_crew_runs_user_id_created_at_id', table_name='crew_runs')
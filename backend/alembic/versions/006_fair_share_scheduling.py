@@ -0,0 +1,30 @@
+"""Fair-share scheduling: user plans, per-crew limits
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-04-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('plan', sa.String(), server_default='free', nullable=False))
+    op.add_column('crews', sa.Column('max_concurrent_runs', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_crew_runs_pending_user_id_created_at', 'crew_runs', ['user_id', 'created_at', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_crew_runs_pending_user_id_created_at', table_name='crew_runs')
+    op.drop_column('crews', 'max_concurrent_runs')
+    op.drop_column('users', 'plan')
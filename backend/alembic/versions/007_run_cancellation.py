@@ -0,0 +1,27 @@
+"""Run cancellation: per-crew budgets, charged credits
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-04-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('crews', sa.Column('max_runtime_seconds', sa.Integer(), nullable=True))
+    op.add_column('crews', sa.Column('max_tokens', sa.Integer(), nullable=True))
+    op.add_column('crew_runs', sa.Column('credits_charged', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('crew_runs', 'credits_charged')
+    op.drop_column('crews', 'max_tokens')
+    op.drop_column('crews', 'max_runtime_seconds')
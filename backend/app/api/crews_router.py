@@ -1,99 +1,415 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Tuple
+from datetime import datetime
 from uuid import UUID
+import asyncio
+import base64
+import json
 
 from app.db.session import get_db
-from app.schemas.crew import Crew, CrewRun, CrewRunCreate, CrewRunStatus
+from app.schemas.crew import (
+    Crew, CrewRun, CrewRunBatch, CrewRunBatchCreate, CrewRunCancel, CrewRunCreate, CrewRunPage, CrewRunStatus,
+    CrewRunStatusBatch, QueueStats, RunEventsToken
+)
 from app.schemas.user import User
-from app.crud.crew import get_crews, get_crew, create_crew_run, get_crew_run
-from app.crud.user import deduct_user_credits
-from app.core.auth import get_current_user
-from app.services.crew_runner import execute_crew_task
+from app.crud.crew import (
+    cancel_crew_run, create_paid_crew_run, create_paid_crew_runs, get_crew_run_by_idempotency_key, get_crew_run_output,
+    get_crew_run_partial_output, get_crew_run_status_row, get_crew_runs_by_ids, get_queue_position, get_queue_stats,
+    get_user_crew_runs, hash_inputs
+)
+from app.crud.user import get_user
+from app.core.auth import create_run_events_token, get_current_user, get_run_events_user
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.run_budget import CANCEL_USER
+from app.core.run_status_cache import RunStatusEntry, TERMINAL_EVENTS, TERMINAL_STATUSES, run_status_cache
+from app.services.crew_catalog import crew_catalog
+from app.services.crew_runner import crew_runner
 from app.services.ws_manager import manager
+from app.services import wire_protocol
 
 router = APIRouter()
 
+# Queue positions need the full fair-share window query, so each is reused briefly
+queue_position_cache = TTLCache(maxsize=settings.RUN_STATUS_CACHE_SIZE, ttl=settings.RUN_QUEUE_POSITION_TTL)
+
 
 @router.get("/", response_model=List[Crew])
-async def get_available_crews(db: Session = Depends(get_db)):
+async def get_available_crews(
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
     """Get list of all available crews"""
-    crews = get_crews(db)
-    return crews
+    await crew_catalog.ensure_loaded(db)
+    headers = {
+        "ETag": crew_catalog.etag,
+        "Cache-Control": f"public, max-age={settings.CREW_CATALOG_MAX_AGE}"
+    }
+    if crew_catalog.matches(if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=crew_catalog.body, media_type="application/json", headers=headers)
+
+
+def _replay_idempotent_run(crew_run, crew_id: int, crew_run_data: CrewRunCreate, response: Response):
+    """Return the run an earlier request created with the same Idempotency-Key"""
+    if crew_run.crew_id != crew_id or crew_run.inputs_hash != hash_inputs(crew_run_data.inputs):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request"
+        )
+    response.headers["Idempotent-Replayed"] = "true"
+    return crew_run
 
 
 @router.post("/{crew_id}/run", response_model=CrewRun)
 async def run_crew(
     crew_id: int,
     crew_run_data: CrewRunCreate,
-    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Execute a crew task"""
+    # A retried request returns the original run instead of charging again
+    if idempotency_key:
+        existing = await get_crew_run_by_idempotency_key(db, current_user.id, idempotency_key)
+        if existing:
+            return _replay_idempotent_run(existing, crew_id, crew_run_data, response)
+    
     # Get crew information
-    crew = get_crew(db, crew_id)
+    crew = await crew_catalog.get_crew(db, crew_id)
     if not crew:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Crew not found"
         )
     
-    # Check if user has enough credits
-    if current_user.credits < crew.credits_required:
+    # Deduct credits and create the run record in one transaction; the run stays
+    # PENDING until a worker claims it (or is COMPLETED at once from a memoized result)
+    try:
+        crew_run = await create_paid_crew_run(db, current_user.id, crew, crew_run_data, idempotency_key)
+    except IntegrityError:
+        # A concurrent request with the same Idempotency-Key created the run first;
+        # rolling back also undoes this request's credit deduction
+        await db.rollback()
+        existing = await get_crew_run_by_idempotency_key(db, current_user.id, idempotency_key)
+        if not existing:
+            raise
+        return _replay_idempotent_run(existing, crew_id, crew_run_data, response)
+    if not crew_run:
+        db_user = await get_user(db, current_user.id)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient credits. Required: {crew.credits_required}, Available: {current_user.credits}"
+            detail=f"Insufficient credits. Required: {crew.credits_required}, Available: {db_user.credits}"
         )
     
-    # Deduct credits from user
-    updated_user = deduct_user_credits(db, current_user.id, crew.credits_required)
-    if not updated_user:
+    return crew_run
+
+
+def _check_batch_size(size: int):
+    if size > settings.RUN_BATCH_MAX_SIZE:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Failed to deduct credits"
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Batch too large. Maximum: {settings.RUN_BATCH_MAX_SIZE}, Requested: {size}"
+        )
+
+
+@router.post("/{crew_id}/runs:batch", response_model=CrewRunBatch)
+async def run_crew_batch(
+    crew_id: int,
+    batch: CrewRunBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Execute a crew once per item, charging for all of them in one transaction"""
+    _check_batch_size(len(batch.items))
+    crew = await crew_catalog.get_crew(db, crew_id)
+    if not crew:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Crew not found"
         )
     
-    # Create crew run record
-    crew_run = create_crew_run(db, current_user.id, crew_id, crew_run_data)
+    crew_runs = await create_paid_crew_runs(db, current_user.id, crew, batch.items)
+    if crew_runs is None:
+        db_user = await get_user(db, current_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Insufficient credits. Required: {crew.credits_required * len(batch.items)}, Available: {db_user.credits}"
+        )
     
-    # Start crew execution as background task
-    background_tasks.add_task(
-        execute_crew_task,
-        crew_run.id,
-        crew.crew_identifier,
-        crew_run_data.inputs,
-        manager
+    return CrewRunBatch(items=crew_runs)
+
+
+@router.get("/queue", response_model=QueueStats)
+async def get_run_queue_stats(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get run queue depth and wait times"""
+    return await get_queue_stats(db)
+
+
+def _encode_cursor(created_at: datetime, run_id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{run_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        created_at, run_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(run_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+@router.get("/runs", response_model=CrewRunPage)
+async def list_runs(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    status_filter: Optional[str] = Query(None, alias="status", pattern="^(PENDING|RUNNING|COMPLETED|FAILED|CANCELLED|active)$"),
+    crew_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """List the current user's runs, newest first"""
+    before = _decode_cursor(cursor) if cursor else None
+    # One extra row tells whether another page follows
+    runs = await get_user_crew_runs(
+        db, current_user.id, limit + 1, before=before, status=status_filter, crew_id=crew_id
     )
-    
-    return crew_run
+    next_cursor = None
+    if len(runs) > limit:
+        runs = runs[:limit]
+        next_cursor = _encode_cursor(runs[-1].created_at, runs[-1].id)
+    return CrewRunPage(items=runs, next_cursor=next_cursor)
 
 
-@router.get("/runs/{run_id}", response_model=CrewRunStatus)
-async def get_run_status(
-    run_id: UUID,
+@router.get("/runs:batch", response_model=CrewRunStatusBatch)
+async def get_run_statuses(
+    ids: List[str] = Query(..., description="Run ids, repeated or comma-separated"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get the status and result of a specific crew run"""
-    crew_run = get_crew_run(db, run_id)
-    if not crew_run:
+    """Get the status and result of many crew runs at once"""
+    try:
+        run_ids = list(dict.fromkeys(UUID(run_id) for value in ids for run_id in value.split(",") if run_id))
+    except ValueError:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Crew run not found"
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be run UUIDs"
         )
+    _check_batch_size(len(run_ids))
+    
+    # Runs of other users are reported as missing, like unknown ids
+    crew_runs = {crew_run.id: crew_run for crew_run in await get_crew_runs_by_ids(db, current_user.id, run_ids)}
+    return CrewRunStatusBatch(
+        items=[CrewRunStatus.model_validate(crew_runs[run_id], from_attributes=True) for run_id in run_ids if run_id in crew_runs],
+        missing=[run_id for run_id in run_ids if run_id not in crew_runs]
+    )
+
+
+async def _get_owned_run_status(db: AsyncSession, run_id: UUID, current_user: User) -> RunStatusEntry:
+    """A run's status from the status cache, reading crew_runs (without output) only on a miss"""
+    entry = run_status_cache.get(run_id)
+    if entry is None:
+        crew_run = await get_crew_run_status_row(db, run_id)
+        if not crew_run:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Crew run not found"
+            )
+        entry = run_status_cache.put(crew_run)
+    elif run_status_cache.should_verify():
+        # Sampled check of the cache against the database, for the coherence metrics
+        crew_run = await get_crew_run_status_row(db, run_id)
+        if crew_run:
+            entry = run_status_cache.record_verification(entry, crew_run)
     
     # Check if the run belongs to the current user
-    if crew_run.user_id != current_user.id:
+    if entry.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
+    return entry
+
+
+async def _wait_for_status_change(run_id: str, baseline: str, timeout: float) -> bool:
+    """Block until this process sees the run leave baseline status, or the timeout passes"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    subscriber, _ = manager.subscribe(run_id)
+    try:
+        while True:
+            # The first event means a worker picked the run up; complete/error/cancelled end it
+            buffer = manager.get_run_buffer(run_id)
+            if buffer and buffer.status != baseline:
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(subscriber.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return False
+    finally:
+        manager.unsubscribe(run_id, subscriber)
+
+
+@router.get("/runs/{run_id}", response_model=CrewRunStatus)
+async def get_run_status(
+    run_id: UUID,
+    wait: float = Query(0, ge=0, le=settings.RUN_STATUS_MAX_WAIT, description="Seconds to wait for a status change"),
+    last_status: Optional[str] = Query(None, description="Status the client already has; a different one returns at once"),
+    include_output: bool = Query(False, description="Load the output (or partial output) along with the status"),
+    include_position: bool = Query(False, description="Estimate a PENDING run's place in the queue"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the status and result of a specific crew run.
+
+    With wait, an unfinished run is held open until its status changes (fed by
+    the run's live events, not by polling the database) or wait seconds pass.
+    """
+    entry = await _get_owned_run_status(db, run_id, current_user)
+    
+    if wait and entry.status not in TERMINAL_STATUSES and last_status in (None, entry.status):
+        # Give the connection (if a cache miss took one) back to the pool for the duration of the wait
+        await db.commit()
+        if await _wait_for_status_change(str(run_id), entry.status, wait):
+            entry = await _get_owned_run_status(db, run_id, current_user)
+    
+    # Queued runs report their place in line when asked; finished runs have their full output and
+    # running ones expose what has streamed so far
+    output = partial_output = queue_position = None
+    if entry.status == "PENDING":
+        if include_position:
+            queue_position = queue_position_cache.get(entry.id)
+            if queue_position is None:
+                queue_position = await get_queue_position(db, entry.id, settings.RUN_LEASE_SECONDS)
+                queue_position_cache.set(entry.id, queue_position)
+    elif include_output:
+        if entry.status in TERMINAL_STATUSES:
+            output = await get_crew_run_output(db, entry.id)
+        elif entry.status == "RUNNING":
+            # The replay buffer has it when this process has seen the whole run so far
+            partial_output = manager.buffered_output(str(entry.id))
+            if partial_output is None:
+                partial_output = await get_crew_run_partial_output(db, entry.id)
+            partial_output = partial_output or None
     
     return CrewRunStatus(
-        id=crew_run.id,
-        status=crew_run.status,
-        output=crew_run.output,
-        created_at=crew_run.created_at,
-        completed_at=crew_run.completed_at
-    )
\ No newline at end of file
+        id=entry.id,
+        status=entry.status,
+        output=output,
+        partial_output=partial_output,
+        queue_position=queue_position,
+        created_at=entry.created_at,
+        started_at=entry.started_at,
+        completed_at=entry.completed_at
+    )
+
+
+@router.post("/runs/{run_id}/cancel", response_model=CrewRunCancel)
+async def cancel_run(
+    run_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Cancel a queued or executing run, refunding part of its price.
+
+    A queued run is never claimed. An executing run is stopped at once when it
+    runs in this process, otherwise by its worker's next heartbeat.
+    """
+    await _get_owned_run_status(db, run_id, current_user)
+    cancelled = await cancel_crew_run(db, run_id, CANCEL_USER)
+    if cancelled is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Crew run has already finished"
+        )
+    crew_run, interrupted_status, refund = cancelled
+    if interrupted_status == "PENDING":
+        # No worker will ever emit events for it, so end its stream here
+        await manager.send_personal_message({"type": "cancelled", "reason": CANCEL_USER}, str(run_id))
+    else:
+        # Its runner emits "cancelled" after its last chunk
+        crew_runner.cancel(run_id, CANCEL_USER)
+    return CrewRunCancel(id=crew_run.id, status=crew_run.status, refunded_credits=refund)
+
+
+def _sse_frame(event: str, data: str, event_id: Optional[int] = None) -> str:
+    frame = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{frame}event: {event}\ndata: {data}\n\n"
+
+
+async def _run_event_stream(run_id: str, run_status: str, output: Optional[str], after_seq: Optional[int]) -> AsyncIterator[str]:
+    """SSE frames for one run: its current status, buffered events after after_seq, then live events"""
+    subscriber, replay = manager.subscribe(run_id, after_seq=after_seq or 0)
+    try:
+        yield _sse_frame("status", json.dumps({"status": run_status, "output": output}))
+        for message, encodings in replay:
+            yield _sse_frame(message["type"], encodings[wire_protocol.JSON], message["seq"])
+            if message["type"] in TERMINAL_EVENTS:
+                return
+        # Finished before this process buffered anything; the status frame carried the output
+        if run_status in TERMINAL_STATUSES:
+            return
+        
+        while not subscriber.overflowed:
+            try:
+                message, encodings = await asyncio.wait_for(subscriber.queue.get(), settings.SSE_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _sse_frame(message["type"], encodings[wire_protocol.JSON], message["seq"])
+            if message["type"] in TERMINAL_EVENTS:
+                return
+        # Too slow to keep up: ending the stream makes EventSource reconnect with Last-Event-ID
+    finally:
+        manager.unsubscribe(run_id, subscriber)
+
+
+@router.post("/runs/{run_id}/events/token", response_model=RunEventsToken)
+async def create_run_events_stream_token(
+    run_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Issue a short-lived token that opens only this run's event stream"""
+    await _get_owned_run_status(db, run_id, current_user)
+    return RunEventsToken(
+        token=create_run_events_token(current_user.email, run_id),
+        expires_in=settings.SSE_TOKEN_EXPIRE_SECONDS
+    )
+
+
+@router.get("/runs/{run_id}/events")
+async def stream_run_events(
+    run_id: UUID,
+    last_event_id: Optional[int] = Header(None),
+    current_user: User = Depends(get_run_events_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Server-Sent Events stream of a run's progress, for clients without WebSockets.
+
+    Authenticates with the usual Authorization header or, since a browser's
+    EventSource cannot send one, a ?token= from POST /runs/{run_id}/events/token.
+    Reconnects resume after Last-Event-ID from this process's replay buffer.
+    """
+    entry = await _get_owned_run_status(db, run_id, current_user)
+    output = await get_crew_run_output(db, entry.id) if entry.status in TERMINAL_STATUSES else None
+    # The stream never touches the database, so do not hold a connection for its lifetime
+    await db.commit()
+    return StreamingResponse(
+        _run_event_stream(str(run_id), entry.status, output, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,17 +1,35 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+from uuid import UUID
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.cache import TTLCache
 from app.db.session import get_db
-from app.schemas.user import TokenData
+from app.schemas.user import TokenData, User
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Scope claim of tokens that only open one run's event stream; access tokens carry none
+RUN_EVENTS_SCOPE = "run_events"
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow, so keep it off the event loop and bound how much can pile up
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_pending_password_jobs = 0
+
+# Authenticated users keyed by token subject (email), so polling endpoints skip the user lookup
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -21,6 +39,30 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+async def _run_password_job(func, *args):
+    global _pending_password_jobs
+    if _pending_password_jobs >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication requests, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    _pending_password_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _pending_password_jobs -= 1
+
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    return await _run_password_job(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -36,7 +78,8 @@ def verify_token(token: str, credentials_exception):
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        # Scoped tokens travel in URLs and must not work as access tokens
+        if email is None or payload.get("scope") is not None:
             raise credentials_exception
         token_data = TokenData(email=email)
     except JWTError:
@@ -44,12 +87,10 @@ def verify_token(token: str, credentials_exception):
     return token_data
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    from app.crud.user import get_user_by_email  # Import here to avoid circular import
-    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -57,7 +98,53 @@ def get_current_user(
     )
     
     token_data = verify_token(credentials.credentials, credentials_exception)
-    user = get_user_by_email(db, email=token_data.email)
+    return await _get_principal(db, token_data.email, credentials_exception)
+
+
+async def _get_principal(db: AsyncSession, email: str, credentials_exception) -> User:
+    from app.crud.user import get_user_by_email  # Import here to avoid circular import
+    
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+    
+    user = await get_user_by_email(db, email=email)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    principal = User.model_validate(user)
+    principal_cache.set(email, principal)
+    return principal
+
+
+def create_run_events_token(email: str, run_id: UUID) -> str:
+    """Short-lived token that authenticates only GET /crews/runs/{run_id}/events"""
+    return create_access_token(
+        {"sub": email, "scope": RUN_EVENTS_SCOPE, "run_id": str(run_id)},
+        expires_delta=timedelta(seconds=settings.SSE_TOKEN_EXPIRE_SECONDS)
+    )
+
+
+async def get_run_events_user(
+    run_id: UUID,
+    token: Optional[str] = Query(None, description="Run events token, for clients that cannot send headers"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_db)
+):
+    """Authenticate an event stream by Authorization header or, for EventSource, by ?token="""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if credentials is not None:
+        token_data = verify_token(credentials.credentials, credentials_exception)
+        return await _get_principal(db, token_data.email, credentials_exception)
+    if token is None:
+        raise credentials_exception
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    if payload.get("scope") != RUN_EVENTS_SCOPE or payload.get("run_id") != str(run_id) or not payload.get("sub"):
+        raise credentials_exception
+    return await _get_principal(db, payload["sub"], credentials_exception)
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+from urllib.parse import urlsplit, urlunsplit
+import requests
+from bs4 import BeautifulSoup
+from crewai_tools import SerperDevTool, ScrapeWebsiteTool
+from app.core.config import settings
+
+
+class ToolResultCache:
+    """Process-wide TTL cache for tool results with single-flight deduplication.
+
+    Concurrent calls for the same key share one upstream call; the others block
+    until it finishes. Entries are evicted least-recently-used once their total
+    size exceeds max_bytes. Failures are never cached: neither exceptions nor
+    results the caller's cacheable predicate rejects (tools report many errors
+    as ordinary return values). Thread-safe, since CrewAI runs tools from
+    worker threads.
+    """
+
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value, size = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            if cacheable is None or cacheable(value):
+                self._store(key, value)
+        # Waiters already coalesced onto this call still share the result
+        future.set_result(value)
+        return value
+
+    def _store(self, key: Hashable, value: Any):
+        size = len(str(value).encode())
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+tool_cache = ToolResultCache(ttl=settings.TOOL_CACHE_TTL, max_bytes=settings.TOOL_CACHE_MAX_BYTES)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    # Scheme and host are case-insensitive; fragments never reach the server
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+class CachedSerperDevTool(SerperDevTool):
+    """SerperDevTool whose results are shared across runs by normalized query"""
+
+    def _run(self, search_query: str, **kwargs: Any) -> Any:
+        key = ("serper", self.search_url, self.n_results, normalize_query(search_query))
+        return tool_cache.get_or_compute(
+            key,
+            lambda: super(CachedSerperDevTool, self)._run(search_query, **kwargs),
+            # Results are formatted text; an error or quota response comes back as Serper's raw JSON
+            cacheable=lambda result: isinstance(result, str)
+        )
+
+
+class CachedScrapeWebsiteTool(ScrapeWebsiteTool):
+    """ScrapeWebsiteTool whose results are shared across runs by normalized URL.
+
+    Fetches the page itself (with the same request and text extraction as
+    ScrapeWebsiteTool) so it can see the HTTP status: error and empty pages
+    are returned to the agent but not cached.
+    """
+
+    def _run(self, **kwargs: Any) -> Any:
+        website_url: Optional[str] = kwargs.get("website_url", self.website_url)
+        if not website_url or self.cookies:
+            # Authenticated scrapes are per-user, so never share them
+            return super()._run(**kwargs)
+        key = ("scrape", normalize_url(website_url))
+        fetched_ok = []
+
+        def scrape() -> str:
+            page = requests.get(website_url, timeout=15, headers=self.headers)
+            fetched_ok.append(page.ok)
+            return self._page_text(page.content)
+
+        return tool_cache.get_or_compute(
+            key, scrape, cacheable=lambda text: all(fetched_ok) and bool(text.strip())
+        )
+
+    @staticmethod
+    def _page_text(content: bytes) -> str:
+        text = BeautifulSoup(content, "html.parser").get_text()
+        text = "\n".join(line for line in text.split("\n") if line.strip())
+        return " ".join(word for word in text.split(" ") if word.strip())
@@ -1,12 +1,25 @@
 from langchain_openai import ChatOpenAI
 import os
+from app.core.config import settings
+from app.core.llm_cache import get_llm_cache
+from app.core.llm_client import get_llm_http_client
 
 
-def get_cerebras_llm():
-    """Configure and return Cerebras LLM for CrewAI"""
+def get_cerebras_llm(temperature: float = 0.5):
+    """Configure and return Cerebras LLM for CrewAI.
+
+    Each crew gets its own ChatOpenAI (CrewAI attaches per-agent callbacks to it),
+    but all of them share one pooled, rate-limited HTTP client.
+    """
+    # Responses are only reproducible enough to cache at low temperatures
+    use_cache = settings.LLM_CACHE_ENABLED and temperature <= settings.LLM_CACHE_MAX_TEMPERATURE
     return ChatOpenAI(
         model="llama3.1-70b",
         api_key=os.environ.get("CEREBRAS_API_KEY"),
-        base_url="https://api.cerebras.ai/v1",
-        temperature=0.5,
-    )
\ No newline at end of file
+        base_url=settings.CEREBRAS_BASE_URL,
+        temperature=temperature,
+        cache=get_llm_cache() if use_cache else False,
+        http_client=get_llm_http_client(),
+        # Retries on 429/503 are handled, process-wide, by the shared client
+        max_retries=0,
+    )
@@ -5,11 +5,17 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "postgresql://crewdeck_user:crewdeck_password@db:5432/crewdeck_db"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    PASSWORD_HASH_WORKERS: int = 4  # Threads for bcrypt (it releases the GIL)
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Queued + running hash jobs before returning 429
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: float = 30.0  # Seconds an authenticated user is served without a DB lookup
     
     # App
     APP_NAME: str = "CrewDeck"
@@ -22,10 +28,88 @@ class Settings(BaseSettings):
     # Cerebras (replacing OpenAI)
     CEREBRAS_API_KEY: Optional[str] = None
     CEREBRAS_MODEL: str = "llama3.1-70b"  # Default Cerebras model
+    CEREBRAS_BASE_URL: str = "https://api.cerebras.ai/v1"
+    
+    # Shared LLM HTTP client
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_MAX_CONCURRENCY: int = 8  # In-flight LLM requests per process
+    LLM_MAX_RETRIES: int = 4  # Retries on 429/503
+    LLM_BACKOFF_BASE: float = 0.5  # Seconds; doubles per consecutive throttle
+    LLM_BACKOFF_MAX: float = 30.0
+    LLM_TIMEOUT: float = 120.0
+    
+    # LLM response cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = ".cache/llm_cache.sqlite"
+    LLM_CACHE_MEMORY_SIZE: int = 1000  # Responses kept in the in-memory tier
+    LLM_CACHE_TTL: float = 7 * 24 * 3600  # Seconds
+    LLM_CACHE_MAX_DISK_BYTES: int = 256 * 1024 * 1024
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.7  # Calls above this temperature bypass the cache
+    
+    # Crew catalog
+    CREW_CATALOG_VERSION: str = "1"  # Bump to change the catalog ETag after editing crews
+    CREW_CATALOG_MAX_AGE: int = 60  # Cache-Control max-age for GET /crews/
+    
+    # Run queue / workers
+    WORKER_CONCURRENCY: int = 4
+    WORKER_POLL_INTERVAL: float = 1.0  # Seconds to wait when the queue is empty
+    WORKER_METRICS_PORT: int = 0  # Port app.worker serves /metrics on; 0 disables
+    RUN_LEASE_SECONDS: int = 300  # A RUNNING run without a heartbeat for this long is re-queued
+    RUN_EMBEDDED_WORKER: bool = True  # Drain the queue inside the API process too
+    RUN_DEFAULT_TIMEOUT_SECONDS: int = 900  # Wall-clock budget for crews without max_runtime_seconds
+    RUN_CANCEL_CHECK_INTERVAL: float = 5.0  # Seconds between a worker's checks for runs cancelled elsewhere
+    RUN_REFUND_POLICY: dict = {"user_pending": 1.0, "user_running": 0.5, "timeout": 1.0, "token_budget": 0.5}  # Fraction of charged credits refunded, by cancel reason
+    
+    # Fair-share scheduling (applied when workers claim runs)
+    RUN_MAX_EXECUTING: int = 32  # Runs executing at once across all workers
+    RUN_MAX_PER_USER: int = 8  # Runs one user may have executing at once
+    RUN_MAX_PER_CREW: int = 16  # Default for crews without max_concurrent_runs
+    PLAN_WEIGHTS: dict = {"free": 1, "pro": 2, "enterprise": 4}  # Share of executing slots per user, by plan
+    RUN_BATCH_MAX_SIZE: int = 500  # Runs per batch submission or bulk status lookup
+    RUN_STATUS_CACHE_SIZE: int = 50000
+    RUN_STATUS_CACHE_TTL: float = 3600.0  # Seconds a finished run's status is kept
+    RUN_STATUS_CACHE_ACTIVE_TTL: float = 30.0  # Seconds an unfinished run's status is trusted after its last write
+    RUN_STATUS_CACHE_VERIFY_RATE: float = 0.01  # Fraction of cache hits checked against the database
+    RUN_QUEUE_POSITION_TTL: float = 5.0  # Seconds a computed queue position is reused for
+    
+    # Run event persistence (crew_run_events)
+    EVENT_PERSISTENCE_ENABLED: bool = True
+    EVENT_WRITER_BATCH_SIZE: int = 500  # Rows per multi-row INSERT; reaching it flushes early
+    EVENT_WRITER_FLUSH_INTERVAL: float = 0.25  # Seconds an event may wait before being written
+    EVENT_WRITER_MAX_PENDING: int = 50000  # Unwritten events held in memory before new ones are dropped
+    
+    # WebSockets
+    BROADCAST_BACKEND: str = "memory"  # memory (single process) or postgres (LISTEN/NOTIFY)
+    WS_SEND_QUEUE_SIZE: int = 256  # Messages buffered per connection before the overflow policy applies
+    WS_OVERFLOW_POLICY: str = "drop_oldest"  # drop_oldest, coalesce or disconnect
+    WS_CHUNK_FLUSH_INTERVAL: float = 0.03  # Seconds llm_chunk events are coalesced for; 0 disables
+    WS_CHUNK_MAX_BYTES: int = 4096  # Flush coalesced llm_chunk content early at this size
+    WS_REPLAY_MAX_EVENTS: int = 2000  # Events kept per run for late joiners
+    WS_REPLAY_MEMORY_BUDGET: int = 64 * 1024 * 1024  # Bytes across all run buffers
+    WS_REPLAY_RETENTION_SECONDS: int = 300  # How long a finished run stays replayable
+    
+    # Server-Sent Events / long polling
+    SSE_KEEPALIVE_INTERVAL: float = 15.0  # Seconds between comment frames on an idle stream
+    SSE_TOKEN_EXPIRE_SECONDS: int = 600  # Lifetime of the ?token= a browser EventSource authenticates with
+    RUN_STATUS_MAX_WAIT: float = 60.0  # Upper bound for ?wait= on GET /crews/runs/{id}
+    
+    # Search / scrape tool cache
+    TOOL_CACHE_TTL: float = 3600.0  # Seconds
+    TOOL_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
     
     # Legacy OpenAI support (for tools that might still need it)
     OPENAI_API_KEY: Optional[str] = None
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """DATABASE_URL rewritten for the asyncpg driver"""
+        url = self.DATABASE_URL
+        for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+            if url.startswith(prefix):
+                return "postgresql+asyncpg://" + url[len(prefix):]
+        return url
+
     class Config:
         env_file = ".env"
 
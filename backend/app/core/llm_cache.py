@@ -0,0 +1,146 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class TieredLLMCache(BaseCache):
+    """LangChain response cache with an in-memory LRU tier over a SQLite file.
+
+    LangChain keys each call by the serialized messages (prompt) and an
+    llm_string describing the model, temperature, stop words and bound tools,
+    so identical requests from repeated runs are served without calling the API.
+    Thread-safe, since CrewAI invokes the model from worker threads.
+    """
+
+    def __init__(self, path: str, memory_size: int, ttl: float, max_disk_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+        self._db.commit()
+        self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            cached = self.memory.get(key)
+            if cached is not None:
+                return cached
+
+            now = time.time()
+            row = self._db.execute(
+                "SELECT value, created_at, size FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at, size = row
+            if created_at < now - self.ttl:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                self._disk_bytes -= size
+                return None
+            self._db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            generations = [loads(item) for item in loads(value)]
+            self.memory.set(key, generations)
+            self.disk_hits += 1
+            return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = self._key(prompt, llm_string)
+        value = dumps([dumps(generation) for generation in return_val])
+        size = len(value)
+        now = time.time()
+        with self._lock:
+            self.memory.set(key, list(return_val))
+            previous = self._db.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)",
+                (key, value, now, now, size)
+            )
+            self._disk_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # Expired entries first, then least recently used until under the size budget
+        expired = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,)
+        ).fetchone()[0]
+        if expired:
+            self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self._disk_bytes -= expired
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM llm_cache ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            for key, size in rows:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._disk_bytes -= size
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self.memory.clear()
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+            self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.disk_hits
+        return {
+            "lookups": lookups,
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": memory["size"],
+            "disk_bytes": self._disk_bytes,
+        }
+
+
+_llm_cache: Optional[TieredLLMCache] = None
+
+
+def get_llm_cache() -> TieredLLMCache:
+    """Process-wide LLM response cache, opened on first use"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = TieredLLMCache(
+            path=settings.LLM_CACHE_PATH,
+            memory_size=settings.LLM_CACHE_MEMORY_SIZE,
+            ttl=settings.LLM_CACHE_TTL,
+            max_disk_bytes=settings.LLM_CACHE_MAX_DISK_BYTES
+        )
+    return _llm_cache
@@ -0,0 +1,209 @@
+import functools
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+import httpx
+from app.core.config import settings
+from app.core.run_budget import RunBudget, current_run_budget
+
+RETRY_STATUSES = (429, 503)
+
+
+class BudgetedStream(httpx.SyncByteStream):
+    """Response body wrapper that enforces the calling run's budget.
+
+    Checks for cancellation before every chunk, so cancelling a run stops an
+    upstream stream mid-response (closing the connection), and charges the
+    tokens the response used: one per streamed "data:" event, or the reported
+    usage.total_tokens of a plain JSON response.
+    """
+
+    def __init__(self, stream: httpx.SyncByteStream, budget: RunBudget, streaming: bool):
+        self._stream = stream
+        self._budget = budget
+        self._streaming = streaming
+
+    def __iter__(self) -> Iterator[bytes]:
+        body = bytearray()
+        for chunk in self._stream:
+            self._budget.check()
+            if self._streaming:
+                self._budget.add_tokens(chunk.count(b"data: ") - chunk.count(b"data: [DONE]"))
+            else:
+                body += chunk
+            yield chunk
+        if not self._streaming:
+            try:
+                usage = json.loads(body).get("usage") or {}
+                self._budget.add_tokens(int(usage.get("total_tokens", 0)))
+            except (ValueError, AttributeError, TypeError):
+                pass
+
+    def close(self):
+        self._stream.close()
+
+
+class SlotStream(httpx.SyncByteStream):
+    """Response body wrapper that keeps a LimitedTransport slot until the body is closed.
+
+    Streamed completions arrive long after the headers, so the slot (and the
+    upstream timing) must cover the whole body, not just the time to first byte.
+    """
+
+    def __init__(self, stream: httpx.SyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+
+class LimitedTransport(httpx.BaseTransport):
+    """httpx transport that caps in-flight LLM requests and backs off on 429/503.
+
+    A 429/503 from upstream pauses every caller in the process (not just the one
+    that got it) until the backoff expires, so the whole process slows down
+    together instead of hammering the API with retries.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, max_concurrency: int, max_retries: int,
+                 backoff_base: float, backoff_max: float):
+        self._transport = transport
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+        self._consecutive_throttles = 0
+        # Metrics
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.queue_seconds = 0.0
+        self.upstream_seconds = 0.0
+        self.max_queue_seconds = 0.0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        # Set while a crew run is executing; cancelled runs make no further upstream calls
+        budget = current_run_budget.get()
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_cooldown()
+            queued_at = time.monotonic()
+            self._slots.acquire()
+            started_at = time.monotonic()
+            with self._lock:
+                self.in_flight += 1
+                waited = started_at - queued_at
+                self.queue_seconds += waited
+                self.max_queue_seconds = max(self.max_queue_seconds, waited)
+            try:
+                if budget:
+                    budget.check()
+                response = self._transport.handle_request(request)
+            except BaseException:
+                self._release(started_at)
+                raise
+            # Released when the body is closed: after read() for plain responses, or once
+            # the caller is done with a streamed completion
+            response.stream = SlotStream(response.stream, functools.partial(self._release, started_at))
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                if response.status_code not in RETRY_STATUSES:
+                    with self._lock:
+                        self._consecutive_throttles = 0
+                if budget:
+                    streaming = response.headers.get("content-type", "").startswith("text/event-stream")
+                    response.stream = BudgetedStream(response.stream, budget, streaming)
+                return response
+
+            response.read()
+            response.close()
+            self._throttle(response)
+        return response
+
+    def _release(self, started_at: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.upstream_seconds += time.monotonic() - started_at
+        self._slots.release()
+
+    def _wait_for_cooldown(self):
+        while True:
+            with self._lock:
+                delay = self._cooldown_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _throttle(self, response: httpx.Response):
+        with self._lock:
+            self.throttled += 1
+            self.retries += 1
+            self._consecutive_throttles += 1
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (self._consecutive_throttles - 1))
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    delay = min(self.backoff_max, max(delay, float(retry_after)))
+                except ValueError:
+                    pass
+            delay *= random.uniform(0.8, 1.2)
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+
+    def close(self):
+        self._transport.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.requests or 1
+            return {
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "avg_queue_seconds": self.queue_seconds / requests,
+                "max_queue_seconds": self.max_queue_seconds,
+                "avg_upstream_seconds": self.upstream_seconds / requests,
+            }
+
+
+_llm_http_client: Optional[httpx.Client] = None
+_llm_transport: Optional[LimitedTransport] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_http_client() -> httpx.Client:
+    """Process-wide pooled HTTP client shared by every LLM instance"""
+    global _llm_http_client, _llm_transport
+    with _client_lock:
+        if _llm_http_client is None:
+            limits = httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+            )
+            _llm_transport = LimitedTransport(
+                httpx.HTTPTransport(limits=limits),
+                max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                max_retries=settings.LLM_MAX_RETRIES,
+                backoff_base=settings.LLM_BACKOFF_BASE,
+                backoff_max=settings.LLM_BACKOFF_MAX
+            )
+            _llm_http_client = httpx.Client(transport=_llm_transport, timeout=settings.LLM_TIMEOUT)
+        return _llm_http_client
+
+
+def get_llm_client_stats() -> Dict[str, Any]:
+    return _llm_transport.stats() if _llm_transport else {}
@@ -0,0 +1,206 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Instrumented code only does a dict lookup and a few integer updates per
+observation; labels are positional tuples and histogram buckets are found by
+bisection. Formatting happens at scrape time. Metrics are updated from the
+event loop thread, so no locking is needed.
+"""
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; spans fast cache-served reads up to slow database-bound requests
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; crew runs and queue waits take from seconds to the run timeout
+RUN_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 900.0, 1800.0)
+
+# (name, type, help, [(label names, label values, value[, sample name suffix])])
+MetricFamily = Tuple[str, str, str, List[tuple]]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonically increasing count per label combination"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> Iterable[MetricFamily]:
+        yield self.name, self.type, self.help, [
+            (self.labelnames, labels, value) for labels, value in self._values.items()
+        ]
+
+
+class Histogram:
+    """Bucketed distribution per label combination.
+
+    Counts are kept per bucket and made cumulative only when rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, *labels: str) -> int:
+        counts = self._values.get(labels)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def collect(self) -> Iterable[MetricFamily]:
+        samples = []
+        bucket_names = self.labelnames + ("le",)
+        bounds = self.buckets + (math.inf,)
+        for labels, counts in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                samples.append((bucket_names, labels + (_format_value(bound),), cumulative, "_bucket"))
+            samples.append((self.labelnames, labels, counts[-1], "_sum"))
+            samples.append((self.labelnames, labels, cumulative, "_count"))
+        yield self.name, self.type, self.help, samples
+
+
+class MetricsRegistry:
+    """Renders registered metrics, plus values read at scrape time from collectors"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._metrics: List = []
+        # Called on every scrape; each returns metric families (names without the prefix)
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(self.prefix + name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(self.prefix + name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        families = [family for metric in self._metrics for family in metric.collect()]
+        for collector in self._collectors:
+            families.extend(
+                (self.prefix + name, metric_type, help, samples)
+                for name, metric_type, help, samples in collector()
+            )
+        for name, metric_type, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample in samples:
+                names, values, value = sample[:3]
+                suffix = sample[3] if len(sample) > 3 else ""
+                lines.append(f"{name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def stats_families(component: str, stats: Dict[str, float], help: str) -> Iterable[MetricFamily]:
+    """Expose an existing stats() dict as one untyped metric per numeric field"""
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{component}_{key}", "untyped", f"{help}: {key}", [((), (), value)]
+
+
+# Global metrics registry instance
+metrics = MetricsRegistry("crewdeck_")
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+crew_run_duration = metrics.histogram(
+    "crew_run_duration_seconds", "Crew run execution time", ("crew_identifier", "status"), RUN_BUCKETS
+)
+crew_run_queue_wait = metrics.histogram(
+    "crew_run_queue_wait_seconds", "Time from submission to a worker claiming the run", ("crew_identifier",), RUN_BUCKETS
+)
+run_events_published = metrics.counter(
+    "run_events_published_total", "Run events published by this process", ("type",)
+)
+ws_frames_sent = metrics.counter(
+    "ws_frames_sent_total", "WebSocket frames written to clients"
+)
+ws_frames_dropped = metrics.counter(
+    "ws_frames_dropped_total", "Run events not delivered as sent to a slow client", ("reason",)
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording http_request_duration.
+
+    Labelled by the matched route's path template, so ids in URLs do not
+    create new series. Streaming responses are timed to their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status_code)
+            )
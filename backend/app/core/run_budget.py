@@ -0,0 +1,71 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+# Why a run was stopped; also the keys of RUN_REFUND_POLICY (user cancels are split by prior status)
+CANCEL_USER = "user"
+CANCEL_TIMEOUT = "timeout"
+CANCEL_TOKEN_BUDGET = "token_budget"
+
+CANCEL_MESSAGES = {
+    CANCEL_USER: "Cancelled by user",
+    CANCEL_TIMEOUT: "Cancelled: exceeded the crew's wall-clock budget",
+    CANCEL_TOKEN_BUDGET: "Cancelled: exceeded the crew's token budget",
+}
+
+
+class RunCancelled(Exception):
+    """Raised inside a run's LLM calls once the run has been cancelled"""
+
+    def __init__(self, reason: str):
+        super().__init__(CANCEL_MESSAGES.get(reason, reason))
+        self.reason = reason
+
+
+class RunBudget:
+    """Cancellation flag and token budget of one executing run.
+
+    Shared between the run's asyncio task and any threads its LLM calls run in:
+    the LLM HTTP transport checks it before each request and while streaming,
+    and adds the tokens each response reports.
+    """
+
+    def __init__(self, run_id: str, max_tokens: Optional[int] = None):
+        self.run_id = run_id
+        self.max_tokens = max_tokens
+        self.tokens_used = 0
+        self.reason: Optional[str] = None
+        self.started_at = time.monotonic()
+        # Called once, from whichever thread cancels, to stop the run's task
+        self.on_cancel: Optional[Callable[[], None]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str) -> bool:
+        """Mark the run cancelled; only the first reason sticks"""
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+        if self.on_cancel:
+            self.on_cancel()
+        return True
+
+    def check(self):
+        if self.reason is not None:
+            raise RunCancelled(self.reason)
+
+    def add_tokens(self, tokens: int):
+        with self._lock:
+            self.tokens_used += tokens
+            exceeded = self.max_tokens is not None and self.tokens_used > self.max_tokens
+        if exceeded:
+            self.cancel(CANCEL_TOKEN_BUDGET)
+
+
+# The budget of the run the current task (or a thread it started) is executing
+current_run_budget: ContextVar[Optional[RunBudget]] = ContextVar("current_run_budget", default=None)
@@ -0,0 +1,134 @@
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "CANCELLED")
+# Run events that end a run, and the status each leaves it in
+TERMINAL_EVENTS = {"complete": "COMPLETED", "error": "FAILED", "cancelled": "CANCELLED"}
+
+
+class RunStatusEntry:
+    """A crew_runs row minus inputs and output"""
+
+    __slots__ = ("id", "user_id", "status", "created_at", "started_at", "completed_at", "written_at")
+
+    def __init__(self, id, user_id, status, created_at, started_at=None, completed_at=None):
+        self.id = id
+        self.user_id = user_id
+        self.status = status
+        self.created_at = created_at
+        self.started_at = started_at
+        self.completed_at = completed_at
+        self.written_at = time.monotonic()
+
+
+class RunStatusCache:
+    """Write-through cache of run statuses, so status reads skip crew_runs.
+
+    Entries are written when a run is created, on every transition the runner
+    makes, and from live run events (which reach every API process through the
+    broadcast backend). Finished runs never change, so their entries live for
+    ttl; an unfinished run's entry is only trusted for active_ttl after its last
+    write, bounding staleness if an event is ever lost.
+
+    Kept in-process behind get/put/transition so a shared store can replace it.
+    """
+
+    def __init__(self, maxsize: int = None, ttl: float = None, active_ttl: float = None, verify_rate: float = None):
+        self._entries = TTLCache(maxsize or settings.RUN_STATUS_CACHE_SIZE, ttl or settings.RUN_STATUS_CACHE_TTL)
+        self.active_ttl = active_ttl or settings.RUN_STATUS_CACHE_ACTIVE_TTL
+        self.verify_rate = settings.RUN_STATUS_CACHE_VERIFY_RATE if verify_rate is None else verify_rate
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0  # Unfinished entries older than active_ttl, reloaded from the database
+        self.writes = 0
+        self.verified = 0
+        self.mismatches = 0  # Verified entries whose status disagreed with the database
+
+    def get(self, run_id) -> Optional[RunStatusEntry]:
+        entry = self._entries.get(str(run_id))
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.status not in TERMINAL_STATUSES and time.monotonic() - entry.written_at > self.active_ttl:
+            self.stale += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, crew_run: Any) -> RunStatusEntry:
+        """Store (or overwrite with) a row's authoritative status"""
+        entry = RunStatusEntry(
+            crew_run.id, crew_run.user_id, crew_run.status,
+            crew_run.created_at, crew_run.started_at, crew_run.completed_at
+        )
+        self._entries.set(str(crew_run.id), entry)
+        self.writes += 1
+        return entry
+
+    def transition(self, run_id, status: str):
+        """Move a cached run to a new status; runs that are not cached are left for the next read.
+
+        Finished runs keep their status: an event that arrives after the run
+        was cancelled (or otherwise finished) must not overwrite it.
+        """
+        entry = self._entries.peek(str(run_id))
+        if entry is None or entry.status in TERMINAL_STATUSES:
+            return
+        now = datetime.now(timezone.utc)
+        if status == "RUNNING" and entry.started_at is None:
+            entry.started_at = now
+        if status == "COMPLETED" and entry.completed_at is None:
+            entry.completed_at = now
+        entry.status = status
+        entry.written_at = time.monotonic()
+        self.writes += 1
+
+    def apply_event(self, run_id: str, message: dict):
+        """Follow a run's status from its published events"""
+        event_type = message.get("type")
+        if event_type in TERMINAL_EVENTS:
+            self.transition(run_id, TERMINAL_EVENTS[event_type])
+        else:
+            entry = self._entries.peek(run_id)
+            if entry is not None and entry.status == "PENDING":
+                # The first event means a worker claimed the run
+                self.transition(run_id, "RUNNING")
+
+    def should_verify(self) -> bool:
+        """Whether to check this hit against the database, to measure coherence"""
+        return self.verify_rate > 0 and random.random() < self.verify_rate
+
+    def record_verification(self, entry: RunStatusEntry, crew_run: Any) -> RunStatusEntry:
+        """Compare a cached entry with the row just read; returns whichever is authoritative"""
+        self.verified += 1
+        if entry.status != crew_run.status:
+            self.mismatches += 1
+            return self.put(crew_run)
+        return entry
+
+    def invalidate(self, run_id):
+        self._entries.invalidate(str(run_id))
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "writes": self.writes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "verified": self.verified,
+            "mismatches": self.mismatches,
+            "coherence": 1 - self.mismatches / self.verified if self.verified else 1.0,
+        }
+
+
+# Global run status cache instance
+run_status_cache = RunStatusCache()
@@ -1,15 +1,42 @@
-from crewai import Agent, Task, Crew
-from crewai_tools import SerperDevTool
+from crewai import Crew
 from typing import Dict, Any
 import asyncio
 from app.core.cerebras_llm import get_cerebras_llm
+from app.crews.templates import AgentTemplate, search_tool
+
+# The content strategist agent
+STRATEGIST = AgentTemplate(
+    role='Content Strategist',
+    goal='Create a comprehensive content strategy for a blog post about {topic}',
+    backstory="""You are an experienced content strategist who understands 
+            how to create engaging, SEO-optimized content that resonates with target audiences. 
+            You excel at research and planning compelling narratives.""",
+    tools=[search_tool]
+)
+
+# The writer agent
+WRITER = AgentTemplate(
+    role='Blog Writer',
+    goal='Write an engaging and informative blog post about {topic}',
+    backstory="""You are a skilled blog writer with expertise in creating 
+            {tone} content for {target_audience}. You have a talent for making complex 
+            topics accessible and engaging while maintaining accuracy and credibility."""
+)
+
+# The editor agent
+EDITOR = AgentTemplate(
+    role='Content Editor',
+    goal='Review and polish the blog post for quality and engagement',
+    backstory="""You are a meticulous content editor with an eye for detail 
+            and a deep understanding of what makes content compelling. You ensure 
+            clarity, flow, and engagement while maintaining the author's voice."""
+)
 
 
 class BlogWriterCrew:
     def __init__(self, callback_handler):
         self.callback_handler = callback_handler
-        self.search_tool = SerperDevTool()
-        # Initialize Cerebras LLM
+        # Initialize Cerebras LLM (per run: CrewAI attaches per-agent callbacks to it)
         self.llm = get_cerebras_llm()
 
     async def execute(self, inputs: Dict[str, Any]) -> str:
@@ -21,42 +48,10 @@ class BlogWriterCrew:
         
         await self.callback_handler.on_agent_start("Content Strategist", f"Planning blog post about: {topic}")
         
-        # Create the content strategist agent with Cerebras LLM
-        strategist = Agent(
-            role='Content Strategist',
-            goal=f'Create a comprehensive content strategy for a blog post about {topic}',
-            backstory="""You are an experienced content strategist who understands 
-            how to create engaging, SEO-optimized content that resonates with target audiences. 
-            You excel at research and planning compelling narratives.""",
-            tools=[self.search_tool],
-            llm=self.llm,
-            verbose=True,
-            allow_delegation=False
-        )
-        
-        # Create the writer agent with Cerebras LLM
-        writer = Agent(
-            role='Blog Writer',
-            goal=f'Write an engaging and informative blog post about {topic}',
-            backstory=f"""You are a skilled blog writer with expertise in creating 
-            {tone} content for {target_audience}. You have a talent for making complex 
-            topics accessible and engaging while maintaining accuracy and credibility.""",
-            llm=self.llm,
-            verbose=True,
-            allow_delegation=False
-        )
-        
-        # Create the editor agent with Cerebras LLM
-        editor = Agent(
-            role='Content Editor',
-            goal='Review and polish the blog post for quality and engagement',
-            backstory="""You are a meticulous content editor with an eye for detail 
-            and a deep understanding of what makes content compelling. You ensure 
-            clarity, flow, and engagement while maintaining the author's voice.""",
-            llm=self.llm,
-            verbose=True,
-            allow_delegation=False
-        )
+        # Bind this run's inputs to the pre-built agent templates
+        strategist = STRATEGIST.build(self.llm, topic=topic)
+        writer = WRITER.build(self.llm, topic=topic, tone=tone, target_audience=target_audience)
+        editor = EDITOR.build(self.llm)
         
         await self.callback_handler.on_agent_action("System", "Executing blog writing crew with Cerebras AI...")
         
@@ -1,53 +1,31 @@
-from crewai import Agent, Task, Crew
-from crewai_tools import SerperDevTool, ScrapeWebsiteTool
+from crewai import Crew
 from typing import Dict, Any
 import asyncio
 from app.core.cerebras_llm import get_cerebras_llm
+from app.crews.templates import AgentTemplate, TaskTemplate, search_tool, scrape_tool
 
-
-class MarketResearcherCrew:
-    def __init__(self, callback_handler):
-        self.callback_handler = callback_handler
-        self.search_tool = SerperDevTool()
-        self.scrape_tool = ScrapeWebsiteTool()
-        # Initialize Cerebras LLM
-        self.llm = get_cerebras_llm()
-
-    async def execute(self, inputs: Dict[str, Any]) -> str:
-        """Execute market research crew"""
-        
-        topic = inputs.get("topic", "AI technology trends")
-        
-        await self.callback_handler.on_agent_start("Market Researcher", f"Researching: {topic}")
-        
-        # Create the researcher agent with Cerebras LLM
-        researcher = Agent(
-            role='Market Researcher',
-            goal=f'Research comprehensive information about {topic}',
-            backstory="""You are an expert market researcher with years of experience 
+# The researcher agent
+RESEARCHER = AgentTemplate(
+    role='Market Researcher',
+    goal='Research comprehensive information about {topic}',
+    backstory="""You are an expert market researcher with years of experience 
             in analyzing market trends, competitor analysis, and industry insights. 
             You have a keen eye for identifying opportunities and threats in various markets.""",
-            tools=[self.search_tool, self.scrape_tool],
-            llm=self.llm,
-            verbose=True,
-            allow_delegation=False
-        )
-        
-        # Create the analyst agent with Cerebras LLM
-        analyst = Agent(
-            role='Market Analyst',
-            goal='Analyze research data and provide actionable insights',
-            backstory="""You are a seasoned market analyst who excels at interpreting 
+    tools=[search_tool, scrape_tool]
+)
+
+# The analyst agent
+ANALYST = AgentTemplate(
+    role='Market Analyst',
+    goal='Analyze research data and provide actionable insights',
+    backstory="""You are a seasoned market analyst who excels at interpreting 
             research data and transforming it into clear, actionable business insights. 
-            You have a talent for identifying patterns and trends that others might miss.""",
-            llm=self.llm,
-            verbose=True,
-            allow_delegation=False
-        )
-        
-        # Create research task
-        research_task = Task(
-            description=f"""
+            You have a talent for identifying patterns and trends that others might miss."""
+)
+
+# Research task
+RESEARCH_TASK = TaskTemplate(
+    description="""
             Conduct comprehensive market research on {topic}. Your research should include:
             1. Current market size and growth trends
             2. Key players and competitors
@@ -57,13 +35,12 @@ class MarketResearcherCrew:
             
             Use web search and scraping tools to gather the most current information.
             """,
-            agent=researcher,
-            expected_output="A detailed research report with current market data and trends"
-        )
-        
-        # Create analysis task
-        analysis_task = Task(
-            description=f"""
+    expected_output="A detailed research report with current market data and trends"
+)
+
+# Analysis task
+ANALYSIS_TASK = TaskTemplate(
+    description="""
             Analyze the research data about {topic} and provide:
             1. Key insights and takeaways
             2. SWOT analysis (Strengths, Weaknesses, Opportunities, Threats)
@@ -73,9 +50,28 @@ class MarketResearcherCrew:
             
             Present your analysis in a clear, executive-summary format.
             """,
-            agent=analyst,
-            expected_output="A comprehensive market analysis with actionable insights and recommendations"
-        )
+    expected_output="A comprehensive market analysis with actionable insights and recommendations"
+)
+
+
+class MarketResearcherCrew:
+    def __init__(self, callback_handler):
+        self.callback_handler = callback_handler
+        # Initialize Cerebras LLM (per run: CrewAI attaches per-agent callbacks to it)
+        self.llm = get_cerebras_llm()
+
+    async def execute(self, inputs: Dict[str, Any]) -> str:
+        """Execute market research crew"""
+        
+        topic = inputs.get("topic", "AI technology trends")
+        
+        await self.callback_handler.on_agent_start("Market Researcher", f"Researching: {topic}")
+        
+        # Bind this run's inputs to the pre-built agent and task templates
+        researcher = RESEARCHER.build(self.llm, topic=topic)
+        analyst = ANALYST.build(self.llm)
+        research_task = RESEARCH_TASK.build(researcher, topic=topic)
+        analysis_task = ANALYSIS_TASK.build(analyst, topic=topic)
         
         # Create and execute the crew
         crew = Crew(
@@ -0,0 +1,59 @@
+from string import Formatter
+from typing import Any, Dict, Sequence, Tuple
+from crewai import Agent, Task
+from app.core.cached_tools import CachedSerperDevTool, CachedScrapeWebsiteTool
+
+# Tools are stateless apart from the shared result cache, so one instance serves every run
+search_tool = CachedSerperDevTool()
+scrape_tool = CachedScrapeWebsiteTool()
+
+
+class TextTemplate:
+    """A str.format template parsed once, so binding a run's inputs is a single format call"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.fields: Tuple[str, ...] = tuple(dict.fromkeys(
+            field for _, field, _, _ in Formatter().parse(text) if field
+        ))
+
+    def render(self, inputs: Dict[str, Any]) -> str:
+        if not self.fields:
+            return self.text
+        return self.text.format_map({field: inputs[field] for field in self.fields})
+
+
+class AgentTemplate:
+    """Agent definition compiled once per process; build() binds a run's inputs"""
+
+    def __init__(self, role: str, goal: str, backstory: str, tools: Sequence[Any] = ()):
+        self.role = role
+        self.goal = TextTemplate(goal)
+        self.backstory = TextTemplate(backstory)
+        self.tools = list(tools)
+
+    def build(self, llm, **inputs) -> Agent:
+        return Agent(
+            role=self.role,
+            goal=self.goal.render(inputs),
+            backstory=self.backstory.render(inputs),
+            tools=self.tools,
+            llm=llm,
+            verbose=True,
+            allow_delegation=False
+        )
+
+
+class TaskTemplate:
+    """Task definition compiled once per process; build() binds a run's inputs and agent"""
+
+    def __init__(self, description: str, expected_output: str):
+        self.description = TextTemplate(description)
+        self.expected_output = expected_output
+
+    def build(self, agent: Agent, **inputs) -> Task:
+        return Task(
+            description=self.description.render(inputs),
+            agent=agent,
+            expected_output=self.expected_output
+        )
@@ -1,44 +1,23 @@
-from crewai import Agent, Task, Crew
-from crewai_tools import SerperDevTool
+from crewai import Crew
 from typing import Dict, Any
 import asyncio
 from app.core.cerebras_llm import get_cerebras_llm
+from app.crews.templates import AgentTemplate, TaskTemplate, search_tool
 
-
-class TravelPlannerCrew:
-    def __init__(self, callback_handler):
-        self.callback_handler = callback_handler
-        self.search_tool = SerperDevTool()
-        # Initialize Cerebras LLM
-        self.llm = get_cerebras_llm()
-
-    async def execute(self, inputs: Dict[str, Any]) -> str:
-        """Execute travel planning crew (single agent)"""
-        
-        destination = inputs.get("destination", "Paris, France")
-        duration = inputs.get("duration", "7 days")
-        budget = inputs.get("budget", "$3000")
-        interests = inputs.get("interests", "culture, food, history")
-        
-        await self.callback_handler.on_agent_start("Travel Planner", f"Planning trip to {destination}")
-        
-        # Create the travel planner agent (single agent setup) with Cerebras LLM
-        planner = Agent(
-            role='Expert Travel Planner',
-            goal=f'Create a comprehensive {duration} travel plan for {destination} within budget of {budget}',
-            backstory=f"""You are an experienced travel planner with extensive knowledge 
+# The travel planner agent (single agent setup)
+PLANNER = AgentTemplate(
+    role='Expert Travel Planner',
+    goal='Create a comprehensive {duration} travel plan for {destination} within budget of {budget}',
+    backstory="""You are an experienced travel planner with extensive knowledge 
             of destinations worldwide. You specialize in creating personalized itineraries 
             that match travelers' interests in {interests} while staying within budget. 
             You have insider knowledge of the best attractions, restaurants, and hidden gems.""",
-            tools=[self.search_tool],
-            llm=self.llm,
-            verbose=True,
-            allow_delegation=False
-        )
-        
-        # Create comprehensive travel planning task
-        planning_task = Task(
-            description=f"""
+    tools=[search_tool]
+)
+
+# Comprehensive travel planning task
+PLANNING_TASK = TaskTemplate(
+    description="""
             Create a detailed {duration} travel itinerary for {destination} with the following requirements:
             
             **Trip Details:**
@@ -60,9 +39,30 @@ class TravelPlannerCrew:
             Research current information about attractions, opening hours, prices, and seasonal considerations.
             Ensure all recommendations align with the traveler's interests and budget constraints.
             """,
-            agent=planner,
-            expected_output="A comprehensive, detailed travel itinerary with all requested components"
-        )
+    expected_output="A comprehensive, detailed travel itinerary with all requested components"
+)
+
+
+class TravelPlannerCrew:
+    def __init__(self, callback_handler):
+        self.callback_handler = callback_handler
+        # Initialize Cerebras LLM (per run: CrewAI attaches per-agent callbacks to it)
+        self.llm = get_cerebras_llm()
+
+    async def execute(self, inputs: Dict[str, Any]) -> str:
+        """Execute travel planning crew (single agent)"""
+        
+        destination = inputs.get("destination", "Paris, France")
+        duration = inputs.get("duration", "7 days")
+        budget = inputs.get("budget", "$3000")
+        interests = inputs.get("interests", "culture, food, history")
+        
+        await self.callback_handler.on_agent_start("Travel Planner", f"Planning trip to {destination}")
+        
+        # Bind this run's inputs to the pre-built agent and task templates
+        trip = dict(destination=destination, duration=duration, budget=budget, interests=interests)
+        planner = PLANNER.build(self.llm, **trip)
+        planning_task = PLANNING_TASK.build(planner, **trip)
         
         # Create and execute the crew (single agent)
         crew = Crew(
@@ -1,27 +1,58 @@
-from sqlalchemy.orm import Session
-from app.db.models import Crew, CrewRun
+from sqlalchemy import select, insert, update, delete, func, or_, and_, case, cast, Float, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, defer, load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from app.db.models import Crew, CrewRun, CrewRunEvent, User, ACTIVE_RUN_CLAUSE
+from app.core.config import settings
+from app.crud.user import deduct_user_credits
+from app.core.auth import principal_cache
+from app.core.run_status_cache import run_status_cache
+from app.core.run_budget import CANCEL_MESSAGES, CANCEL_USER
+from app.schemas.user import User as UserSchema
 from app.schemas.crew import CrewRunCreate
-from typing import Optional, List
+from typing import Optional, List, Tuple, Dict, Any
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
+import hashlib
+import json
 import uuid
 
 
-def get_crews(db: Session) -> List[Crew]:
+def _canonicalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(key): _canonicalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(item) for item in value]
+    return value
+
+
+def hash_inputs(inputs: Dict[str, Any]) -> str:
+    """sha256 of run inputs with keys sorted and surrounding whitespace stripped"""
+    canonical = json.dumps(_canonicalize(inputs), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def get_crews(db: AsyncSession) -> List[Crew]:
     """Get all crews"""
-    return db.query(Crew).all()
+    result = await db.execute(select(Crew))
+    return list(result.scalars().all())
 
 
-def get_crew(db: Session, crew_id: int) -> Optional[Crew]:
+async def get_crew(db: AsyncSession, crew_id: int) -> Optional[Crew]:
     """Get crew by ID"""
-    return db.query(Crew).filter(Crew.id == crew_id).first()
+    result = await db.execute(select(Crew).filter(Crew.id == crew_id))
+    return result.scalars().first()
 
 
-def get_crew_by_identifier(db: Session, crew_identifier: str) -> Optional[Crew]:
+async def get_crew_by_identifier(db: AsyncSession, crew_identifier: str) -> Optional[Crew]:
     """Get crew by identifier"""
-    return db.query(Crew).filter(Crew.crew_identifier == crew_identifier).first()
+    result = await db.execute(select(Crew).filter(Crew.crew_identifier == crew_identifier))
+    return result.scalars().first()
 
 
-def create_crew_run(db: Session, user_id: UUID, crew_id: int, crew_run_data: CrewRunCreate) -> CrewRun:
+async def create_crew_run(db: AsyncSession, user_id: UUID, crew_id: int, crew_run_data: CrewRunCreate) -> CrewRun:
     """Create a new crew run"""
     db_crew_run = CrewRun(
         id=uuid.uuid4(),
@@ -31,33 +62,264 @@ def create_crew_run(db: Session, user_id: UUID, crew_id: int, crew_run_data: Cre
         status="PENDING"
     )
     db.add(db_crew_run)
-    db.commit()
-    db.refresh(db_crew_run)
+    await db.commit()
+    await db.refresh(db_crew_run)
+    # The response schema nests the crew, which cannot be lazy-loaded under asyncio
+    await db.refresh(db_crew_run, attribute_names=["crew"])
     return db_crew_run
 
 
-def get_crew_run(db: Session, run_id) -> Optional[CrewRun]:
+async def create_paid_crew_run(
+    db: AsyncSession,
+    user_id: UUID,
+    crew: Crew,
+    crew_run_data: CrewRunCreate,
+    idempotency_key: Optional[str] = None
+) -> Optional[CrewRun]:
+    """Deduct the crew's credits and create its run in a single transaction.
+
+    Returns None, leaving nothing changed, when the user cannot afford the crew.
+    For crews with memoization enabled, a recent completed run with the same
+    inputs is reused: the new run is created COMPLETED with its output and is
+    never queued. Raises IntegrityError if a concurrent request already used
+    idempotency_key; the caller should roll back and look the run up.
+    """
+    inputs_hash = hash_inputs(crew_run_data.inputs)
+    source = None
+    if crew.memoize_ttl_seconds:
+        source = await get_memoized_crew_run(db, crew.id, inputs_hash, crew.memoize_ttl_seconds)
+    user = await deduct_user_credits(db, user_id, crew.credits_required, commit=False)
+    if user is None:
+        await db.rollback()
+        return None
+    db_crew_run = CrewRun(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        crew_id=crew.id,
+        inputs=crew_run_data.inputs,
+        inputs_hash=inputs_hash,
+        idempotency_key=idempotency_key,
+        status="PENDING",
+        output=None,
+        started_at=None,
+        heartbeat_at=None,
+        completed_at=None,
+        memoized_from_id=None,
+        credits_charged=crew.credits_required
+    )
+    if source is not None:
+        now = datetime.now(timezone.utc)
+        db_crew_run.status = "COMPLETED"
+        db_crew_run.output = source.output
+        db_crew_run.started_at = now
+        db_crew_run.completed_at = now
+        db_crew_run.memoized_from_id = source.id
+    db.add(db_crew_run)
+    # created_at comes back through INSERT ... RETURNING, so no refresh is needed
+    await db.commit()
+    principal_cache.set(user.email, UserSchema.model_validate(user))
+    run_status_cache.put(db_crew_run)
+    # Attach the crew for the response without loading or cascading it
+    set_committed_value(db_crew_run, "crew", crew)
+    return db_crew_run
+
+
+async def create_paid_crew_runs(
+    db: AsyncSession,
+    user_id: UUID,
+    crew: Crew,
+    items: List[CrewRunCreate]
+) -> Optional[List[CrewRun]]:
+    """Batch version of create_paid_crew_run: one deduction and one multi-row INSERT.
+
+    The total price is deducted atomically, so either every run is created or,
+    when the user cannot afford all of them, none is and None is returned.
+    """
+    hashes = [hash_inputs(item.inputs) for item in items]
+    sources: Dict[str, CrewRun] = {}
+    if crew.memoize_ttl_seconds:
+        sources = await get_memoized_crew_runs(db, crew.id, set(hashes), crew.memoize_ttl_seconds)
+    user = await deduct_user_credits(db, user_id, crew.credits_required * len(items), commit=False)
+    if user is None:
+        await db.rollback()
+        return None
+    now = datetime.now(timezone.utc)
+    rows = []
+    for item, inputs_hash in zip(items, hashes):
+        source = sources.get(inputs_hash)
+        rows.append({
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "crew_id": crew.id,
+            "inputs": item.inputs,
+            "inputs_hash": inputs_hash,
+            "idempotency_key": None,
+            "status": "COMPLETED" if source else "PENDING",
+            "output": source.output if source else None,
+            "started_at": now if source else None,
+            "heartbeat_at": None,
+            "completed_at": now if source else None,
+            "memoized_from_id": source.id if source else None,
+            "credits_charged": crew.credits_required,
+        })
+    # Every row has the same keys, so this is a single INSERT ... VALUES (...), (...) RETURNING
+    result = await db.scalars(insert(CrewRun).returning(CrewRun), rows)
+    crew_runs = list(result.all())
+    # Committing makes the PENDING runs claimable by workers all at once
+    await db.commit()
+    principal_cache.set(user.email, UserSchema.model_validate(user))
+    for crew_run in crew_runs:
+        run_status_cache.put(crew_run)
+    return crew_runs
+
+
+async def get_crew_runs_by_ids(db: AsyncSession, user_id: UUID, run_ids: List[UUID]) -> List[CrewRun]:
+    """Many of a user's runs in one query; ids that are unknown or not theirs are skipped"""
+    result = await db.execute(
+        select(CrewRun).filter(CrewRun.id.in_(run_ids), CrewRun.user_id == user_id)
+    )
+    return list(result.scalars().all())
+
+
+async def get_crew_run_by_idempotency_key(db: AsyncSession, user_id: UUID, idempotency_key: str) -> Optional[CrewRun]:
+    """Get the run a user already created with this Idempotency-Key"""
+    result = await db.execute(
+        select(CrewRun)
+        .options(selectinload(CrewRun.crew))
+        .filter(CrewRun.user_id == user_id, CrewRun.idempotency_key == idempotency_key)
+    )
+    return result.scalars().first()
+
+
+async def get_memoized_crew_run(db: AsyncSession, crew_id: int, inputs_hash: str, ttl_seconds: int) -> Optional[CrewRun]:
+    """Get the latest run of a crew that completed with the same inputs within the TTL.
+
+    Only runs that actually executed count, so a reused output never outlives its TTL.
+    """
+    result = await db.execute(
+        select(CrewRun)
+        .filter(
+            CrewRun.crew_id == crew_id,
+            CrewRun.inputs_hash == inputs_hash,
+            CrewRun.status == "COMPLETED",
+            CrewRun.memoized_from_id.is_(None),
+            CrewRun.completed_at >= func.now() - timedelta(seconds=ttl_seconds)
+        )
+        .order_by(CrewRun.completed_at.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+async def get_memoized_crew_runs(db: AsyncSession, crew_id: int, inputs_hashes, ttl_seconds: int) -> Dict[str, CrewRun]:
+    """get_memoized_crew_run for many input hashes at once, keyed by hash"""
+    result = await db.execute(
+        select(CrewRun)
+        .distinct(CrewRun.inputs_hash)
+        .filter(
+            CrewRun.crew_id == crew_id,
+            CrewRun.inputs_hash.in_(list(inputs_hashes)),
+            CrewRun.status == "COMPLETED",
+            CrewRun.memoized_from_id.is_(None),
+            CrewRun.completed_at >= func.now() - timedelta(seconds=ttl_seconds)
+        )
+        .order_by(CrewRun.inputs_hash, CrewRun.completed_at.desc())
+    )
+    return {crew_run.inputs_hash: crew_run for crew_run in result.scalars()}
+
+
+async def get_crew_run(db: AsyncSession, run_id) -> Optional[CrewRun]:
     """Get a crew run by ID"""
     try:
         if isinstance(run_id, str):
             run_uuid = UUID(run_id)
         else:
             run_uuid = run_id
-        return db.query(CrewRun).filter(CrewRun.id == run_uuid).first()
     except (ValueError, TypeError):
         return None
+    result = await db.execute(
+        select(CrewRun).options(selectinload(CrewRun.crew)).filter(CrewRun.id == run_uuid)
+    )
+    return result.scalars().first()
+
+
+async def get_user_crew_runs(
+    db: AsyncSession,
+    user_id: UUID,
+    limit: int,
+    before: Optional[Tuple[datetime, UUID]] = None,
+    status: Optional[str] = None,
+    crew_id: Optional[int] = None
+) -> List[CrewRun]:
+    """A page of a user's runs, newest first, without their output.
+
+    Keyset pagination: before is the (created_at, id) of the last run on the
+    previous page, so every page is an index range scan however deep it is.
+    status "active" matches PENDING and RUNNING runs through their partial index.
+    """
+    query = (
+        select(CrewRun)
+        .options(defer(CrewRun.output))
+        .filter(CrewRun.user_id == user_id)
+    )
+    if status == "active":
+        query = query.filter(text(ACTIVE_RUN_CLAUSE))
+    elif status:
+        query = query.filter(CrewRun.status == status)
+    if crew_id is not None:
+        query = query.filter(CrewRun.crew_id == crew_id)
+    if before is not None:
+        query = query.filter(tuple_(CrewRun.created_at, CrewRun.id) < tuple_(*before))
+    result = await db.execute(
+        query.order_by(CrewRun.created_at.desc(), CrewRun.id.desc()).limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def get_crew_run_partial_output(db: AsyncSession, run_id: UUID) -> Optional[str]:
+    """LLM output streamed so far by a run that has not finished, from its persisted events"""
+    result = await db.execute(
+        select(CrewRunEvent.payload)
+        .filter(CrewRunEvent.run_id == run_id, CrewRunEvent.type == "llm_chunk")
+        .order_by(CrewRunEvent.seq)
+    )
+    chunks = [payload.get("content", "") for payload in result.scalars()]
+    return "".join(chunks) if chunks else None
 
 
-def update_crew_run_status(db: Session, run_id, status: str, output: str = None) -> Optional[CrewRun]:
+async def get_crew_run_status_row(db: AsyncSession, run_id: UUID) -> Optional[CrewRun]:
+    """Get a crew run's ownership and status columns only, for the status cache"""
+    result = await db.execute(
+        select(CrewRun)
+        .options(load_only(
+            CrewRun.id, CrewRun.user_id, CrewRun.status,
+            CrewRun.created_at, CrewRun.started_at, CrewRun.completed_at
+        ))
+        .filter(CrewRun.id == run_id)
+    )
+    return result.scalars().first()
+
+
+async def get_crew_run_output(db: AsyncSession, run_id: UUID) -> Optional[str]:
+    """Get just a crew run's output"""
+    return await db.scalar(select(CrewRun.output).filter(CrewRun.id == run_id))
+
+
+async def update_crew_run_status(db: AsyncSession, run_id, status: str, output: str = None) -> Optional[CrewRun]:
     """Update crew run status and output"""
     try:
         if isinstance(run_id, str):
             run_uuid = UUID(run_id)
         else:
             run_uuid = run_id
-        crew_run = db.query(CrewRun).filter(CrewRun.id == run_uuid).first()
     except (ValueError, TypeError):
         return None
+    # Locked so a concurrent cancel either lands first and wins, or waits for this
+    result = await db.execute(select(CrewRun).filter(CrewRun.id == run_uuid).with_for_update())
+    crew_run = result.scalars().first()
+    if crew_run and crew_run.status == "CANCELLED":
+        await db.rollback()
+        return None
     if crew_run:
         crew_run.status = status
         if output:
@@ -65,6 +327,205 @@ def update_crew_run_status(db: Session, run_id, status: str, output: str = None)
         if status == "COMPLETED":
             from datetime import datetime
             crew_run.completed_at = datetime.utcnow()
-        db.commit()
-        db.refresh(crew_run)
-    return crew_run
\ No newline at end of file
+        await db.commit()
+        await db.refresh(crew_run)
+        run_status_cache.put(crew_run)
+    return crew_run
+
+
+# Serializes claims across workers so the concurrency caps cannot be overshot
+RUN_CLAIM_LOCK_ID = 0x63726577
+
+
+def _fair_share_queue(lease_seconds: int):
+    """Claimable runs with their weighted-fair-queuing virtual finish times.
+
+    A user's k-th claimable run (in submission order) finishes, virtually, at
+    (runs the user is executing + k) / the user's plan weight. Serving the lowest
+    virtual finish first gives every user a share of executing slots proportional
+    to their weight, however many runs each has queued.
+
+    Returns (queue subquery, executing-run clause, lease-expired-run clause).
+    """
+    lease_cutoff = func.now() - timedelta(seconds=lease_seconds)
+    executing = and_(CrewRun.status == "RUNNING", CrewRun.heartbeat_at >= lease_cutoff)
+    lease_expired = and_(CrewRun.status == "RUNNING", CrewRun.heartbeat_at < lease_cutoff)
+    running_by_user = (
+        select(CrewRun.user_id, func.count().label("running"))
+        .filter(executing).group_by(CrewRun.user_id).subquery()
+    )
+    running_by_crew = (
+        select(CrewRun.crew_id, func.count().label("running"))
+        .filter(executing).group_by(CrewRun.crew_id).subquery()
+    )
+    user_running = func.coalesce(running_by_user.c.running, 0)
+    weight = case(settings.PLAN_WEIGHTS, value=User.plan, else_=1)
+    position_in_user_queue = func.row_number().over(
+        partition_by=CrewRun.user_id, order_by=(CrewRun.created_at, CrewRun.id)
+    )
+    return (
+        select(
+            CrewRun.id,
+            CrewRun.created_at,
+            ((user_running + position_in_user_queue) / cast(weight, Float)).label("virtual_finish"),
+            user_running.label("user_running"),
+            func.coalesce(running_by_crew.c.running, 0).label("crew_running"),
+            func.coalesce(Crew.max_concurrent_runs, settings.RUN_MAX_PER_CREW).label("crew_limit")
+        )
+        .join(Crew, CrewRun.crew_id == Crew.id)
+        .join(User, CrewRun.user_id == User.id)
+        .outerjoin(running_by_user, running_by_user.c.user_id == CrewRun.user_id)
+        .outerjoin(running_by_crew, running_by_crew.c.crew_id == CrewRun.crew_id)
+        .filter(or_(CrewRun.status == "PENDING", lease_expired))
+        .subquery()
+    ), executing, lease_expired
+
+
+async def claim_next_crew_run(db: AsyncSession, lease_seconds: int) -> Optional[Tuple[UUID, str, Dict[str, Any], Crew, datetime, bool]]:
+    """Claim the next run for this worker under the fair-share policy.
+
+    Picks among PENDING runs, plus RUNNING runs whose worker stopped
+    heartbeating, the one with the lowest virtual finish time whose user and
+    crew are below their concurrency caps, provided fewer than
+    RUN_MAX_EXECUTING runs are executing. Claims are serialized with a
+    transaction-scoped advisory lock, so concurrent workers never claim the
+    same row or overshoot a cap.
+    Returns (run_id, crew_identifier, inputs, crew, created_at, reclaimed), where
+    reclaimed is True for a run taken over from a worker whose lease expired,
+    or None when nothing may start now.
+    """
+    queue, executing, lease_expired = _fair_share_queue(lease_seconds)
+    await db.execute(select(func.pg_advisory_xact_lock(RUN_CLAIM_LOCK_ID)))
+    executing_count = await db.scalar(select(func.count(CrewRun.id)).filter(executing))
+    if executing_count >= settings.RUN_MAX_EXECUTING:
+        await db.rollback()
+        return None
+    next_run_id = await db.scalar(
+        select(queue.c.id)
+        .filter(queue.c.user_running < settings.RUN_MAX_PER_USER, queue.c.crew_running < queue.c.crew_limit)
+        .order_by(queue.c.virtual_finish, queue.c.created_at)
+        .limit(1)
+    )
+    if next_run_id is None:
+        await db.rollback()
+        return None
+    result = await db.execute(
+        select(CrewRun, Crew)
+        .join(Crew, CrewRun.crew_id == Crew.id)
+        .filter(CrewRun.id == next_run_id, or_(CrewRun.status == "PENDING", lease_expired))
+        .with_for_update(skip_locked=True, of=CrewRun)
+    )
+    row = result.first()
+    if row is None:
+        await db.rollback()
+        return None
+    crew_run, crew = row
+    reclaimed = crew_run.status == "RUNNING"
+    claimed = (crew_run.id, crew.crew_identifier, crew_run.inputs, crew, crew_run.created_at, reclaimed)
+    if reclaimed:
+        # Re-running from the start; the previous attempt's events would repeat its seq numbers
+        await db.execute(delete(CrewRunEvent).where(CrewRunEvent.run_id == crew_run.id))
+    crew_run.status = "RUNNING"
+    crew_run.started_at = func.now()
+    crew_run.heartbeat_at = func.now()
+    await db.commit()
+    run_status_cache.transition(claimed[0], "RUNNING")
+    return claimed
+
+
+async def get_queue_position(db: AsyncSession, run_id: UUID, lease_seconds: int) -> Optional[int]:
+    """1-based place of a claimable run in fair-share order.
+
+    An estimate: runs held back by a user or crew cap still count as ahead.
+    """
+    queue, _, _ = _fair_share_queue(lease_seconds)
+    ranked = select(
+        queue.c.id,
+        func.rank().over(order_by=(queue.c.virtual_finish, queue.c.created_at)).label("position")
+    ).subquery()
+    return await db.scalar(select(ranked.c.position).filter(ranked.c.id == run_id))
+
+
+async def touch_crew_run_heartbeat(db: AsyncSession, run_id: UUID) -> Optional[str]:
+    """Extend the lease on a run this worker is still executing.
+
+    Returns the run's status: RUNNING while the lease was extended, otherwise
+    whatever the run has become (e.g. CANCELLED from another process).
+    """
+    result = await db.execute(
+        update(CrewRun)
+        .where(CrewRun.id == run_id, CrewRun.status == "RUNNING")
+        .values(heartbeat_at=func.now())
+        .returning(CrewRun.status)
+    )
+    run_status = result.scalar()
+    if run_status is None:
+        run_status = await db.scalar(select(CrewRun.status).filter(CrewRun.id == run_id))
+    await db.commit()
+    return run_status
+
+
+async def cancel_crew_run(db: AsyncSession, run_id: UUID, reason: str) -> Optional[Tuple[CrewRun, str, int]]:
+    """Mark an unfinished run CANCELLED and refund part of its price.
+
+    The refunded fraction of credits_charged comes from RUN_REFUND_POLICY,
+    keyed by reason; user cancels are keyed by the status they interrupted
+    ("user_pending", "user_running"). Returns (run, the status it was
+    cancelled from, refunded credits), or None when it had already finished.
+    """
+    result = await db.execute(
+        select(CrewRun)
+        .filter(CrewRun.id == run_id, text(ACTIVE_RUN_CLAUSE))
+        .with_for_update()
+    )
+    crew_run = result.scalars().first()
+    if crew_run is None:
+        await db.rollback()
+        return None
+    interrupted_status = crew_run.status
+    policy_key = f"{reason}_{interrupted_status.lower()}" if reason == CANCEL_USER else reason
+    refund = int((crew_run.credits_charged or 0) * settings.RUN_REFUND_POLICY.get(policy_key, 0.0))
+    crew_run.status = "CANCELLED"
+    crew_run.output = CANCEL_MESSAGES.get(reason, reason)
+    crew_run.completed_at = func.now()
+    user = None
+    if refund:
+        user = (await db.execute(
+            update(User)
+            .where(User.id == crew_run.user_id)
+            .values(credits=User.credits + refund)
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )).scalars().first()
+    await db.commit()
+    await db.refresh(crew_run)
+    if user is not None:
+        principal_cache.set(user.email, UserSchema.model_validate(user))
+    run_status_cache.put(crew_run)
+    return crew_run, interrupted_status, refund
+
+
+async def get_queue_stats(db: AsyncSession) -> Dict[str, Any]:
+    """Queue depth and wait-time figures for monitoring"""
+    now = func.now()
+    pending = await db.execute(
+        select(
+            func.count(CrewRun.id),
+            func.extract("epoch", now - func.min(CrewRun.created_at))
+        ).filter(CrewRun.status == "PENDING")
+    )
+    pending_count, oldest_pending_seconds = pending.one()
+    running_count = await db.scalar(
+        select(func.count(CrewRun.id)).filter(CrewRun.status == "RUNNING")
+    )
+    # Average time between enqueue and claim for runs started in the last hour
+    avg_wait_seconds = await db.scalar(
+        select(func.avg(func.extract("epoch", CrewRun.started_at - CrewRun.created_at)))
+        .filter(CrewRun.started_at >= now - timedelta(hours=1))
+    )
+    return {
+        "pending": pending_count,
+        "running": running_count or 0,
+        "oldest_pending_seconds": float(oldest_pending_seconds) if oldest_pending_seconds is not None else None,
+        "avg_wait_seconds": float(avg_wait_seconds) if avg_wait_seconds is not None else None,
+    }
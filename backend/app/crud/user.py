@@ -1,51 +1,68 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import User
-from app.schemas.user import UserCreate
-from app.core.auth import get_password_hash
+from app.schemas.user import UserCreate, User as UserSchema
+from app.core.auth import get_password_hash_async, principal_cache
 from typing import Optional
 from uuid import UUID
 
 
-def get_user(db: Session, user_id: UUID) -> Optional[User]:
+async def get_user(db: AsyncSession, user_id: UUID) -> Optional[User]:
     """Get user by ID"""
-    return db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(select(User).filter(User.id == user_id))
+    return result.scalars().first()
 
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get user by email"""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
 
 
-def create_user(db: Session, user: UserCreate) -> User:
+async def create_user(db: AsyncSession, user: UserCreate) -> User:
     """Create a new user"""
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """Authenticate user with email and password"""
-    from app.core.auth import verify_password
-    user = get_user_by_email(db, email)
+    from app.core.auth import verify_password_async
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user
 
 
-def deduct_user_credits(db: Session, user_id: UUID, credits: int) -> Optional[User]:
-    """Deduct credits from user"""
-    user = get_user(db, user_id)
-    if user and user.credits >= credits:
-        user.credits -= credits
-        db.commit()
-        db.refresh(user)
-        return user
-    return None
\ No newline at end of file
+async def deduct_user_credits(db: AsyncSession, user_id: UUID, credits: int, commit: bool = True) -> Optional[User]:
+    """Atomically deduct credits from user, returning None if the balance is too low.
+
+    The balance check and the decrement happen in a single UPDATE, so concurrent
+    submissions can never overdraw an account. Pass commit=False to make the
+    deduction part of a larger transaction; the caller then owns the commit and
+    the principal cache update.
+    """
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id, User.credits >= credits)
+        .values(credits=User.credits - credits)
+        .returning(User)
+        .execution_options(populate_existing=True)
+    )
+    user = result.scalars().first()
+    if user is None:
+        return None
+    if commit:
+        await db.commit()
+        # Keep the cached principal's balance in step with the database
+        principal_cache.set(user.email, UserSchema.model_validate(user))
+    return user
@@ -1,12 +1,15 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, Text, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import uuid
 
 Base = declarative_base()
 
+# Runs still queued or executing; shared by the partial index and the queries that rely on it
+ACTIVE_RUN_CLAUSE = "status IN ('PENDING', 'RUNNING')"
+
 
 class User(Base):
     __tablename__ = "users"
@@ -15,6 +18,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     credits = Column(Integer, default=20, nullable=False)
+    plan = Column(String, default="free", server_default="free", nullable=False)  # Priority class; see PLAN_WEIGHTS
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship
@@ -30,6 +34,10 @@ class Crew(Base):
     crew_identifier = Column(String, unique=True, nullable=False, index=True)
     credits_required = Column(Integer, nullable=False)
     is_single_agent = Column(Boolean, default=False, nullable=False)
+    memoize_ttl_seconds = Column(Integer, nullable=True)  # Reuse completed outputs for identical inputs; NULL disables
+    max_concurrent_runs = Column(Integer, nullable=True)  # Executing runs allowed at once; NULL uses RUN_MAX_PER_CREW
+    max_runtime_seconds = Column(Integer, nullable=True)  # Wall-clock budget per run; NULL uses RUN_DEFAULT_TIMEOUT_SECONDS
+    max_tokens = Column(Integer, nullable=True)  # LLM token budget per run; NULL is unlimited
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship
@@ -43,11 +51,56 @@ class CrewRun(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     crew_id = Column(Integer, ForeignKey("crews.id"), nullable=False)
     inputs = Column(JSON, nullable=False)
+    inputs_hash = Column(String(64), nullable=True)  # sha256 of the canonicalized inputs
+    idempotency_key = Column(String(255), nullable=True)  # Client-supplied Idempotency-Key, unique per user
+    memoized_from_id = Column(UUID(as_uuid=True), ForeignKey("crew_runs.id"), nullable=True)  # Run whose output was reused
     output = Column(Text, nullable=True)
-    status = Column(String, default="PENDING", nullable=False)  # PENDING, RUNNING, COMPLETED, FAILED
+    status = Column(String, default="PENDING", nullable=False)  # PENDING, RUNNING, COMPLETED, FAILED, CANCELLED
+    credits_charged = Column(Integer, nullable=True)  # Credits deducted at submission, the basis for refunds
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)  # Set when a worker claims the run
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Refreshed while a worker holds the run
     completed_at = Column(DateTime(timezone=True), nullable=True)
 
     # Relationships
     user = relationship("User", back_populates="crew_runs")
-    crew = relationship("Crew", back_populates="crew_runs")
\ No newline at end of file
+    crew = relationship("Crew", back_populates="crew_runs")
+
+    __table_args__ = (
+        # Workers scan for the oldest claimable run
+        Index("ix_crew_runs_status_created_at", "status", "created_at"),
+        # Retried submissions find the original run
+        Index("ix_crew_runs_user_id_idempotency_key", "user_id", "idempotency_key", unique=True),
+        # Memoized submissions find the latest completed run with the same inputs
+        Index("ix_crew_runs_crew_id_inputs_hash", "crew_id", "inputs_hash", "completed_at"),
+        # Run history pages, newest first, optionally filtered by crew or to active runs
+        Index("ix_crew_runs_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_crew_runs_user_id_crew_id_created_at_id", "user_id", "crew_id", "created_at", "id"),
+        Index(
+            "ix_crew_runs_user_id_active", "user_id", "created_at", "id",
+            postgresql_where=text(ACTIVE_RUN_CLAUSE)
+        ),
+        # Fair-share scheduling numbers each user's pending runs in submission order
+        Index(
+            "ix_crew_runs_pending_user_id_created_at", "user_id", "created_at", "id",
+            postgresql_where=text("status = 'PENDING'")
+        ),
+    )
+    # Fetch server defaults (created_at) with INSERT ... RETURNING instead of a follow-up SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
+
+class CrewRunEvent(Base):
+    __tablename__ = "crew_run_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    run_id = Column(UUID(as_uuid=True), ForeignKey("crew_runs.id", ondelete="CASCADE"), nullable=False)
+    seq = Column(Integer, nullable=False)  # Same sequence number the WebSocket clients saw
+    type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Events are always read per run in order
+        Index("ix_crew_run_events_run_id_seq", "run_id", "seq"),
+    )
@@ -1,14 +1,21 @@
+import asyncio
+from typing import Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.api.auth_router import router as auth_router
 from app.api.crews_router import router as crews_router
+from app.api.metrics_router import router as metrics_router
+from app.core.metrics import MetricsMiddleware
 from app.services.ws_manager import manager
+from app.services.run_worker import RunWorker
+from app.services.event_writer import event_writer
 from app.db.session import get_db
 from app.crud.crew import get_crew_run
 from app.core.auth import get_current_user
+from app.core.run_status_cache import run_status_cache
 from app.schemas.user import User
 
 # Create FastAPI app
@@ -27,9 +34,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so the latency it records includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix=f"{settings.API_V1_STR}/auth", tags=["authentication"])
 app.include_router(crews_router, prefix=f"{settings.API_V1_STR}/crews", tags=["crews"])
+app.include_router(metrics_router, tags=["monitoring"])
+
+
+embedded_worker = RunWorker(manager) if settings.RUN_EMBEDDED_WORKER else None
+
+
+@app.on_event("startup")
+async def startup():
+    """Connect the event broadcast backend and, for single-node deployments, drain the run queue in-process"""
+    await manager.start()
+    if embedded_worker:
+        app.state.worker_task = asyncio.create_task(embedded_worker.run_forever())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if embedded_worker:
+        embedded_worker.stop()
+        await app.state.worker_task
+    await event_writer.stop()
+    await manager.stop()
 
 
 @app.get("/")
@@ -51,24 +82,41 @@ async def favicon():
 
 
 @app.websocket("/ws/runs/{run_id}")
-async def websocket_endpoint(websocket: WebSocket, run_id: str, db: Session = Depends(get_db)):
-    """WebSocket endpoint for real-time crew execution updates"""
+async def websocket_endpoint(
+    websocket: WebSocket,
+    run_id: str,
+    last_seq: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """WebSocket endpoint for real-time crew execution updates.
+
+    Buffered events newer than last_seq (all of them by default) are replayed on connect.
+    """
     try:
-        # Verify that the run exists
-        crew_run = get_crew_run(db, run_id)
-        if not crew_run:
-            await websocket.close(code=4004, reason="Run not found")
-            return
-        
-        # Connect to WebSocket
-        await manager.connect(websocket, run_id)
+        # A run with a live replay buffer is known to exist, so reconnects skip the DB
+        buffer = manager.get_run_buffer(run_id)
+        if buffer:
+            run_status = buffer.status
+        else:
+            # Verify that the run exists, from the status cache when possible
+            entry = run_status_cache.get(run_id)
+            if entry is None:
+                crew_run = await get_crew_run(db, run_id)
+                if not crew_run:
+                    await websocket.close(code=4004, reason="Run not found")
+                    return
+                entry = run_status_cache.put(crew_run)
+            run_status = entry.status
         
-        # Send initial connection message
-        await manager.send_personal_message({
+        # Connect to WebSocket, sending the connection message ahead of any replay
+        await manager.connect(websocket, run_id, after_seq=last_seq, greeting={
             "type": "connected",
             "message": f"Connected to run {run_id}",
-            "run_status": crew_run.status
-        }, run_id)
+            "run_status": run_status,
+            "last_seq": buffer.last_seq if buffer else 0,
+            # Events before this sequence number are no longer buffered
+            "first_seq": buffer.first_seq if buffer else 1
+        })
         
         # Keep connection alive and handle messages
         while True:
@@ -76,21 +124,24 @@ async def websocket_endpoint(websocket: WebSocket, run_id: str, db: Session = De
                 # Wait for messages from client (if any)
                 data = await websocket.receive_text()
                 # Echo back or handle client messages if needed
-                await manager.send_personal_message({
+                await manager.send_to(websocket, run_id, {
                     "type": "echo",
                     "message": f"Received: {data}"
-                }, run_id)
+                })
             except WebSocketDisconnect:
                 break
+        
+        # Stop this connection's writer task
+        manager.disconnect(websocket, run_id)
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket, run_id)
     except Exception as e:
         # Handle any other errors
-        await manager.send_personal_message({
+        await manager.send_to(websocket, run_id, {
             "type": "error",
             "message": f"WebSocket error: {str(e)}"
-        }, run_id)
+        })
         manager.disconnect(websocket, run_id)
 
 
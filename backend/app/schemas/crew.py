@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -24,6 +24,10 @@ class CrewRunCreate(BaseModel):
     inputs: Dict[str, Any]
 
 
+class CrewRunBatchCreate(BaseModel):
+    items: List[CrewRunCreate] = Field(..., min_length=1)
+
+
 class CrewRunBase(BaseModel):
     inputs: Dict[str, Any]
     status: str
@@ -35,16 +39,67 @@ class CrewRun(CrewRunBase):
     crew_id: int
     output: Optional[str] = None
     created_at: datetime
+    started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    memoized_from_id: Optional[UUID] = None
     crew: Crew
 
     class Config:
         from_attributes = True
 
 
+class CrewRunSummary(BaseModel):
+    id: UUID
+    crew_id: int
+    inputs: Dict[str, Any]
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    memoized_from_id: Optional[UUID] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CrewRunPage(BaseModel):
+    items: List[CrewRunSummary]
+    next_cursor: Optional[str] = None  # Pass back as cursor for the next page; None on the last page
+
+
+class CrewRunBatch(BaseModel):
+    items: List[CrewRunSummary]
+
+
 class CrewRunStatus(BaseModel):
     id: UUID
     status: str
     output: Optional[str] = None
+    partial_output: Optional[str] = None  # Streamed so far, while the run is PENDING or RUNNING
+    queue_position: Optional[int] = None  # Estimated place in the fair-share queue, while PENDING and requested
     created_at: datetime
-    completed_at: Optional[datetime] = None
\ No newline at end of file
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
+class CrewRunCancel(BaseModel):
+    id: UUID
+    status: str
+    refunded_credits: int  # Returned to the user's balance under RUN_REFUND_POLICY
+
+
+class RunEventsToken(BaseModel):
+    token: str  # Pass as ?token= to GET /crews/runs/{id}/events
+    expires_in: int  # Seconds
+
+
+class QueueStats(BaseModel):
+    pending: int
+    running: int
+    oldest_pending_seconds: Optional[float] = None
+    avg_wait_seconds: Optional[float] = None
+
+
+class CrewRunStatusBatch(BaseModel):
+    items: List[CrewRunStatus]
+    missing: List[UUID] = []  # Requested ids that do not exist or belong to another user
@@ -20,6 +20,7 @@ class UserLogin(BaseModel):
 class User(UserBase):
     id: UUID
     credits: int
+    plan: str = "free"
     created_at: datetime
 
     class Config:
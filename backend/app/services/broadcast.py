@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Called with (run_id, message) for every event, in publish order
+MessageHandler = Callable[[str, dict], None]
+
+
+class BroadcastBackend:
+    """Carries run events from the process executing a crew to every process holding subscribers"""
+
+    async def start(self, handler: Optional[MessageHandler]):
+        """Begin delivering events to handler; None means this process only publishes"""
+        raise NotImplementedError
+
+    async def publish(self, run_id: str, message: dict):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+
+class InMemoryBroadcast(BroadcastBackend):
+    """Single-process backend: publishing delivers straight to the local handler"""
+
+    def __init__(self):
+        self.handler: Optional[MessageHandler] = None
+
+    async def start(self, handler: Optional[MessageHandler]):
+        self.handler = handler
+
+    async def publish(self, run_id: str, message: dict):
+        if self.handler:
+            self.handler(run_id, message)
+
+
+class PostgresBroadcast(BroadcastBackend):
+    """LISTEN/NOTIFY backend, works across processes and hosts sharing the database.
+
+    NOTIFY payloads are limited to 8000 bytes, so larger events (e.g. a final
+    result) are split into fragments and reassembled by the listener.
+    """
+
+    CHANNEL = "crew_run_events"
+    MAX_PAYLOAD = 7000
+    # Seconds; fragments of one message are committed together, so a message still
+    # incomplete after this long lost the rest of its fragments
+    FRAGMENT_TTL = 10.0
+
+    def __init__(self, dsn: str = None):
+        self.dsn = dsn or settings.ASYNC_DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+        self.handler: Optional[MessageHandler] = None
+        self._publish_pool = None
+        self._listen_conn = None
+        self._supervisor: Optional[asyncio.Task] = None
+        # message id -> (monotonic time of its first fragment, fragments received so far)
+        self._fragments: Dict[str, Tuple[float, List[Optional[str]]]] = {}
+
+    async def start(self, handler: Optional[MessageHandler]):
+        import asyncpg
+
+        self.handler = handler
+        # A single publishing connection keeps events from this process in order
+        self._publish_pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=1)
+        if handler is not None:
+            await self._listen()
+            self._supervisor = asyncio.create_task(self._supervise())
+
+    async def publish(self, run_id: str, message: dict):
+        payload = json.dumps({"run_id": run_id, "message": message}, separators=(",", ":"))
+        if len(payload) <= self.MAX_PAYLOAD:
+            await self._publish_pool.execute("SELECT pg_notify($1, $2)", self.CHANNEL, payload)
+            return
+
+        # Each fragment is JSON-encoded again, which at worst doubles it (every character a
+        # quote or backslash); both encodings are ASCII, so characters are bytes
+        size = self.MAX_PAYLOAD // 2
+        parts = [payload[i:i + size] for i in range(0, len(payload), size)]
+        message_id = uuid.uuid4().hex
+        # One transaction delivers every fragment together at commit
+        async with self._publish_pool.acquire() as conn:
+            async with conn.transaction():
+                for index, part in enumerate(parts):
+                    fragment = json.dumps({"f": message_id, "i": index, "n": len(parts), "d": part}, separators=(",", ":"))
+                    await conn.execute("SELECT pg_notify($1, $2)", self.CHANNEL, fragment)
+
+    async def stop(self):
+        if self._supervisor:
+            self._supervisor.cancel()
+        if self._listen_conn and not self._listen_conn.is_closed():
+            await self._listen_conn.close()
+        if self._publish_pool:
+            await self._publish_pool.close()
+
+    async def _listen(self):
+        import asyncpg
+
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        # Fragments that arrived on a dropped connection will never be completed
+        self._fragments.clear()
+        await self._listen_conn.add_listener(self.CHANNEL, self._on_notify)
+
+    async def _supervise(self):
+        # Re-establish LISTEN if the dedicated connection drops
+        while True:
+            await asyncio.sleep(5)
+            if self._listen_conn is None or self._listen_conn.is_closed():
+                try:
+                    await self._listen()
+                    logger.info("Re-established LISTEN on %s", self.CHANNEL)
+                except Exception:
+                    logger.exception("Failed to re-establish LISTEN on %s", self.CHANNEL)
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        data = json.loads(payload)
+        if "f" in data:
+            entry = self._fragments.get(data["f"])
+            if entry is None:
+                now = time.monotonic()
+                self._expire_fragments(now)
+                entry = self._fragments[data["f"]] = (now, [None] * data["n"])
+            parts = entry[1]
+            parts[data["i"]] = data["d"]
+            if any(part is None for part in parts):
+                return
+            del self._fragments[data["f"]]
+            data = json.loads("".join(parts))
+        try:
+            self.handler(data["run_id"], data["message"])
+        except Exception:
+            logger.exception("Failed to deliver event for run %s", data.get("run_id"))
+
+    def _expire_fragments(self, now: float):
+        # e.g. from a publisher that died mid-message
+        for message_id, (started_at, _) in list(self._fragments.items()):
+            if now - started_at > self.FRAGMENT_TTL:
+                del self._fragments[message_id]
+                logger.warning("Dropped incomplete event fragments %s on %s", message_id, self.CHANNEL)
+
+
+def create_broadcast_backend(name: str = None) -> BroadcastBackend:
+    name = name or settings.BROADCAST_BACKEND
+    if name == "memory":
+        return InMemoryBroadcast()
+    if name == "postgres":
+        return PostgresBroadcast()
+    raise ValueError(f"Unknown broadcast backend: {name}")
@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import json
+from typing import Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.crud.crew import get_crews
+from app.db.models import Crew
+from app.schemas.crew import Crew as CrewSchema
+
+
+class CrewCatalog:
+    """Process-wide copy of the crews table, pre-encoded for GET /crews/.
+
+    The table is seeded once, outside the app, so it is read once per process on
+    first use; restart the API after editing crews, and bump CREW_CATALOG_VERSION
+    so clients holding the old ETag refetch.
+    """
+
+    def __init__(self):
+        self._crews_by_id: Dict[int, Crew] = {}
+        self.body: bytes = b"[]"
+        self.etag: Optional[str] = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            crews: List[Crew] = await get_crews(db)
+            # Detach the fully loaded rows so this request's rollbacks cannot expire them
+            for crew in crews:
+                db.expunge(crew)
+            payload = [CrewSchema.model_validate(crew).model_dump(mode="json") for crew in crews]
+            body = json.dumps(payload, separators=(",", ":")).encode()
+            digest = hashlib.sha256(f"{settings.CREW_CATALOG_VERSION}:".encode() + body).hexdigest()
+            self._crews_by_id = {crew.id: crew for crew in crews}
+            self.body = body
+            self.etag = f'"{digest[:32]}"'
+            self._loaded = True
+
+    async def get_crew(self, db: AsyncSession, crew_id: int) -> Optional[Crew]:
+        await self.ensure_loaded(db)
+        return self._crews_by_id.get(crew_id)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header refers to the current catalog"""
+        if not if_none_match or self.etag is None:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags
+
+
+# Global crew catalog instance
+crew_catalog = CrewCatalog()
@@ -1,82 +1,162 @@
 import asyncio
-from typing import Dict, Any
+import importlib
+import time
+from typing import Dict, Any, Optional
 from uuid import UUID
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
-from app.crud.crew import update_crew_run_status, get_crew_by_identifier
+from app.core.config import settings
+from app.core.metrics import crew_run_duration
+from app.core.run_budget import RunBudget, RunCancelled, current_run_budget, CANCEL_TIMEOUT, CANCEL_USER
+from app.db.session import AsyncSessionLocal
+from app.crud.crew import update_crew_run_status, get_crew_by_identifier, cancel_crew_run
 from app.services.ws_manager import ConnectionManager, WebSocketCallbackHandler
-from app.crews.market_researcher import MarketResearcherCrew
-from app.crews.blog_writer import BlogWriterCrew
-from app.crews.travel_planner import TravelPlannerCrew
 
 
 class CrewRunner:
     def __init__(self):
+        # Import paths, resolved on first use: the crews pull in crewai, crewai_tools and
+        # langchain_openai, which API processes that never execute a run should not pay for
         self.crew_registry = {
-            "market_research_crew": MarketResearcherCrew,
-            "blog_writer_crew": BlogWriterCrew,
-            "travel_planner_crew": TravelPlannerCrew,
+            "market_research_crew": "app.crews.market_researcher:MarketResearcherCrew",
+            "blog_writer_crew": "app.crews.blog_writer:BlogWriterCrew",
+            "travel_planner_crew": "app.crews.travel_planner:TravelPlannerCrew",
         }
+        self._crew_classes: Dict[str, type] = {}
+        # Budgets of the runs executing in this process, by run id
+        self.active_runs: Dict[str, RunBudget] = {}
+
+    def get_crew_class(self, crew_identifier: str) -> type:
+        """Import (once) and return the crew class for an identifier"""
+        crew_class = self._crew_classes.get(crew_identifier)
+        if crew_class is None:
+            if crew_identifier not in self.crew_registry:
+                raise ValueError(f"Unknown crew identifier: {crew_identifier}")
+            module_name, class_name = self.crew_registry[crew_identifier].split(":")
+            crew_class = getattr(importlib.import_module(module_name), class_name)
+            self._crew_classes[crew_identifier] = crew_class
+        return crew_class
+
+    def preload(self):
+        """Import every crew up front, for worker processes that will run them anyway"""
+        for crew_identifier in self.crew_registry:
+            self.get_crew_class(crew_identifier)
+
+    def cancel(self, run_id, reason: str = CANCEL_USER) -> bool:
+        """Stop a run executing in this process; False if it is not running here"""
+        budget = self.active_runs.get(str(run_id))
+        return budget.cancel(reason) if budget else False
 
     async def run_crew(
         self,
         run_id: UUID,
         crew_identifier: str,
         inputs: Dict[str, Any],
-        ws_manager: ConnectionManager
+        ws_manager: ConnectionManager,
+        max_runtime_seconds: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        restarted: bool = False
     ):
-        """Execute a crew with WebSocket callbacks for real-time updates"""
-        db = SessionLocal()
+        """Execute a crew with WebSocket callbacks for real-time updates.
+
+        The run is cancelled once it exceeds max_runtime_seconds of wall-clock
+        time or max_tokens of LLM usage, or when cancel() is called: its task is
+        cancelled and its in-flight LLM requests are abandoned, so its worker
+        slot and upstream connections are freed at once.
+
+        restarted marks a run taken over from a worker that stopped
+        heartbeating; its event stream starts over with a "restart" event.
+        """
+        # Create WebSocket callback handler
+        callback_handler = WebSocketCallbackHandler(str(run_id), ws_manager)
         
-        try:
-            # Update status to RUNNING
-            update_crew_run_status(db, run_id, "RUNNING")
-            
-            # Create WebSocket callback handler
-            callback_handler = WebSocketCallbackHandler(str(run_id), ws_manager)
-            
-            # Get crew class from registry
-            if crew_identifier not in self.crew_registry:
-                raise ValueError(f"Unknown crew identifier: {crew_identifier}")
-            
-            crew_class = self.crew_registry[crew_identifier]
-            
-            # Initialize and run the crew
-            crew_instance = crew_class(callback_handler)
-            
-            await callback_handler.on_agent_start("System", f"Starting {crew_identifier}")
-            
-            # Execute the crew
-            result = await crew_instance.execute(inputs)
-            
-            # Update database with result
-            update_crew_run_status(db, run_id, "COMPLETED", result)
-            
-            # Send completion message via WebSocket
-            await callback_handler.on_task_complete(result)
-            
-        except Exception as e:
-            # Update database with error
-            error_msg = str(e)
-            update_crew_run_status(db, run_id, "FAILED", error_msg)
-            
-            # Send error message via WebSocket
-            callback_handler = WebSocketCallbackHandler(str(run_id), ws_manager)
-            await callback_handler.on_error(error_msg)
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        budget = RunBudget(str(run_id), max_tokens)
+        cleaning_up = False
+        interrupts = 0  # task.cancel() calls of our own, to be withdrawn once handled
+
+        def interrupt():
+            nonlocal interrupts
+            # Cancelling again would cut short the cleanup below
+            if not cleaning_up:
+                interrupts += 1
+                task.cancel()
+
+        # cancel() may be called from an LLM request's thread
+        budget.on_cancel = lambda: loop.call_soon_threadsafe(interrupt)
+        timeout = loop.call_later(
+            max_runtime_seconds or settings.RUN_DEFAULT_TIMEOUT_SECONDS, budget.cancel, CANCEL_TIMEOUT
+        )
+        self.active_runs[budget.run_id] = budget
+        budget_token = current_run_budget.set(budget)
+        started = time.perf_counter()
+        outcome = None
+        
+        async with AsyncSessionLocal() as db:
+            try:
+                # The run was already marked RUNNING when a worker claimed it
+                
+                # Get crew class from registry
+                crew_class = self.get_crew_class(crew_identifier)
+                
+                # Initialize and run the crew
+                crew_instance = crew_class(callback_handler)
+                
+                if restarted:
+                    await callback_handler.on_restart()
+                
+                await callback_handler.on_agent_start("System", f"Starting {crew_identifier}")
+                
+                # Execute the crew
+                result = await crew_instance.execute(inputs)
+                # Nothing left to stop; a late cancel must not interrupt the writes below
+                cleaning_up = True
+                
+                # Update database with result; None means the run was cancelled meanwhile
+                if await update_crew_run_status(db, run_id, "COMPLETED", result) is None:
+                    await callback_handler.on_cancelled(budget.reason or CANCEL_USER)
+                    outcome = "CANCELLED"
+                else:
+                    # Send completion message via WebSocket
+                    await callback_handler.on_task_complete(result)
+                    outcome = "COMPLETED"
+                
+            except (asyncio.CancelledError, RunCancelled):
+                if not budget.cancelled:
+                    # Not ours (e.g. the process is shutting down); the lease will re-queue it
+                    raise
+                cleaning_up = True
+                # The cancellation was ours and is handled here; withdraw it so later
+                # asyncio.timeout() or TaskGroup code in this task does not see it
+                for _ in range(interrupts):
+                    task.uncancel()
+                await db.rollback()
+                if budget.reason != CANCEL_USER:
+                    # User cancels were recorded, and refunded, by the API before reaching us
+                    await cancel_crew_run(db, run_id, budget.reason)
+                await callback_handler.on_cancelled(budget.reason)
+                outcome = "CANCELLED"
+                
+            except Exception as e:
+                # Update database with error, discarding any half-finished transaction first
+                error_msg = str(e)
+                cleaning_up = True
+                await db.rollback()
+                if await update_crew_run_status(db, run_id, "FAILED", error_msg) is None:
+                    await callback_handler.on_cancelled(budget.reason or CANCEL_USER)
+                    outcome = "CANCELLED"
+                else:
+                    # Send error message via WebSocket, after any chunks still pending
+                    await callback_handler.on_error(error_msg)
+                    outcome = "FAILED"
             
-        finally:
-            db.close()
+            finally:
+                timeout.cancel()
+                if outcome:
+                    crew_run_duration.observe(time.perf_counter() - started, crew_identifier, outcome)
+                self.active_runs.pop(budget.run_id, None)
+                current_run_budget.reset(budget_token)
 
 
 # Global crew runner instance
 crew_runner = CrewRunner()
 
-
-async def execute_crew_task(
-    run_id: UUID,
-    crew_identifier: str,
-    inputs: Dict[str, Any],
-    ws_manager: ConnectionManager
-):
-    """Background task to execute crew"""
-    await crew_runner.run_crew(run_id, crew_identifier, inputs, ws_manager)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import insert
+from app.core.config import settings
+from app.db.models import CrewRunEvent
+from app.db.session import async_engine
+
+logger = logging.getLogger(__name__)
+
+
+class RunEventWriter:
+    """Batches run events into crew_run_events.
+
+    add() only appends to an in-memory batch. The batch is written with one
+    multi-row INSERT once it reaches batch_size rows or flush_interval seconds
+    after its first event, whichever comes first, so a streaming run costs a
+    handful of statements per second rather than one per chunk.
+    """
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None, max_pending: int = None):
+        self.batch_size = batch_size or settings.EVENT_WRITER_BATCH_SIZE
+        self.flush_interval = settings.EVENT_WRITER_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.max_pending = max_pending or settings.EVENT_WRITER_MAX_PENDING
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # At most one background flush; it keeps writing until nothing is pending
+        self._flush_task: Optional[asyncio.Task] = None
+        # One INSERT at a time keeps each run's events in seq order on disk
+        self._write_lock = asyncio.Lock()
+        # Metrics
+        self.events_written = 0
+        self.events_dropped = 0
+        self.batches_written = 0
+
+    def add(self, run_id: UUID, message: dict):
+        """Queue one published event (already stamped with its seq)"""
+        if len(self._pending) >= self.max_pending:
+            self.events_dropped += 1
+            return
+        self._pending.append({
+            "run_id": run_id,
+            "seq": message.get("seq", 0),
+            "type": message.get("type", "unknown"),
+            "payload": {key: value for key, value in message.items() if key not in ("seq", "type")},
+        })
+        if len(self._pending) >= self.batch_size:
+            self._schedule_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self._schedule_flush)
+
+    def _schedule_flush(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None and not self._flush_task.done():
+            # Its loop picks up the rows added since it started
+            return
+        self._flush_task = asyncio.ensure_future(self.flush())
+        self._flush_task.add_done_callback(self._on_flush_done)
+
+    def _on_flush_done(self, task: asyncio.Task):
+        # Rows added after the flush loop last looked would otherwise wait for the next add()
+        if self._pending and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self._schedule_flush)
+
+    async def flush(self):
+        """Write everything queued so far"""
+        async with self._write_lock:
+            if self._flush_handle:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                try:
+                    async with async_engine.begin() as conn:
+                        await conn.execute(insert(CrewRunEvent), batch)
+                except Exception:
+                    # The events already reached WebSocket subscribers; losing the copy is not fatal
+                    logger.exception("Failed to persist %d run events", len(batch))
+                    self.events_dropped += len(batch)
+                    continue
+                self.events_written += len(batch)
+                self.batches_written += 1
+
+    async def stop(self):
+        """Flush on shutdown"""
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "events_written": self.events_written,
+            "events_dropped": self.events_dropped,
+            "batches_written": self.batches_written,
+        }
+
+
+# Global run event writer instance
+event_writer = RunEventWriter()
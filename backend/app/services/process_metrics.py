@@ -0,0 +1,83 @@
+"""Scrape-time gauges shared by the API and worker processes, and the worker's metrics listener"""
+import asyncio
+import logging
+from typing import Optional
+
+from app.core.auth import principal_cache
+from app.core.llm_client import get_llm_client_stats
+from app.core.metrics import metrics, stats_families
+from app.core.run_status_cache import run_status_cache
+from app.db.session import async_engine
+from app.services.crew_runner import crew_runner
+from app.services.event_writer import event_writer
+from app.services.ws_manager import manager
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _gauge(name: str, help: str, value: float):
+    return name, "gauge", help, [((), (), value)]
+
+
+def collect_process_gauges():
+    """Point-in-time values, read from the live objects only when scraped"""
+    yield _gauge("crew_runs_executing", "Crew runs executing in this process", len(crew_runner.active_runs))
+    yield _gauge(
+        "ws_connections", "Open WebSocket connections",
+        sum(len(connections) for connections in manager.active_connections.values())
+    )
+    yield _gauge("ws_runs_watched", "Runs with at least one WebSocket viewer", len(manager.active_connections))
+    yield _gauge(
+        "sse_subscribers", "Open SSE streams and long polls",
+        sum(len(subscribers) for subscribers in manager.run_subscribers.values())
+    )
+    yield _gauge("run_replay_buffers", "Runs with buffered events for replay", len(manager.run_buffers))
+    yield _gauge("run_replay_bytes", "Bytes held in run replay buffers", manager.replay_bytes)
+
+    pool = async_engine.pool
+    yield _gauge("db_pool_size", "Connections kept open by the async engine's pool", pool.size())
+    yield _gauge("db_pool_checked_out", "Pooled connections in use", pool.checkedout())
+    yield _gauge("db_pool_checked_in", "Pooled connections idle", pool.checkedin())
+    # The pool's counter starts at -pool_size; only connections beyond pool_size are overflow
+    yield _gauge("db_pool_overflow", "Connections open beyond pool_size", max(0, pool.overflow()))
+
+    yield from stats_families("event_writer", event_writer.stats(), "Run event writer")
+    yield from stats_families("run_status_cache", run_status_cache.stats(), "Run status cache")
+    yield from stats_families("principal_cache", principal_cache.stats(), "Authenticated principal cache")
+    yield from stats_families("llm_client", get_llm_client_stats(), "Pooled LLM HTTP client")
+
+
+metrics.register_collector(collect_process_gauges)
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain the headers; the request has no body
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.split()
+        if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+            status, content_type, body = "200 OK", PROMETHEUS_CONTENT_TYPE, metrics.render().encode()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", b"Not Found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port: int, host: str = "0.0.0.0") -> Optional[asyncio.AbstractServer]:
+    """Serve GET /metrics on its own port, for processes without the API (e.g. app.worker)"""
+    if not port:
+        return None
+    server = await asyncio.start_server(_handle_scrape, host, port)
+    logger.info("Serving metrics on %s:%d/metrics", host, port)
+    return server
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Set
+from uuid import UUID
+from app.core.config import settings
+from app.core.metrics import crew_run_queue_wait
+from app.db.session import AsyncSessionLocal
+from app.crud.crew import claim_next_crew_run, touch_crew_run_heartbeat
+from app.core.run_budget import CANCEL_USER
+from app.services.crew_runner import crew_runner
+from app.services.ws_manager import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+class RunWorker:
+    """Drains the crew_runs queue with a bounded number of concurrent runs"""
+
+    def __init__(
+        self,
+        ws_manager: ConnectionManager,
+        concurrency: int = None,
+        poll_interval: float = None,
+        lease_seconds: int = None
+    ):
+        self.ws_manager = ws_manager
+        self.concurrency = concurrency or settings.WORKER_CONCURRENCY
+        self.poll_interval = poll_interval or settings.WORKER_POLL_INTERVAL
+        self.lease_seconds = lease_seconds or settings.RUN_LEASE_SECONDS
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    async def run_forever(self):
+        """Claim and execute runs until stop() is called"""
+        logger.info("Run worker started with concurrency %d", self.concurrency)
+        while not self._stopping.is_set():
+            await self._slots.acquire()
+            if self._stopping.is_set():
+                # stop() arrived while every slot was busy; do not start another run
+                self._slots.release()
+                break
+            try:
+                async with AsyncSessionLocal() as db:
+                    claimed = await claim_next_crew_run(db, self.lease_seconds)
+            except Exception:
+                logger.exception("Failed to claim a crew run")
+                claimed = None
+
+            if claimed is None:
+                self._slots.release()
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            run_id, crew_identifier, inputs, crew, created_at, reclaimed = claimed
+            crew_run_queue_wait.observe((datetime.now(timezone.utc) - created_at).total_seconds(), crew_identifier)
+            task = asyncio.create_task(self._execute(run_id, crew_identifier, inputs, crew, reclaimed))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        # Let in-flight runs finish; anything cut short is re-queued once its lease expires
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info("Run worker stopped")
+
+    def stop(self):
+        self._stopping.set()
+
+    async def _execute(self, run_id: UUID, crew_identifier: str, inputs, crew, reclaimed: bool):
+        heartbeat = asyncio.create_task(self._heartbeat(run_id))
+        try:
+            await crew_runner.run_crew(
+                run_id, crew_identifier, inputs, self.ws_manager,
+                max_runtime_seconds=crew.max_runtime_seconds,
+                max_tokens=crew.max_tokens,
+                restarted=reclaimed
+            )
+        finally:
+            heartbeat.cancel()
+            self._slots.release()
+
+    async def _heartbeat(self, run_id: UUID):
+        # Also how quickly a cancel made through another process stops the run here
+        interval = max(1, min(self.lease_seconds // 3, settings.RUN_CANCEL_CHECK_INTERVAL))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    run_status = await touch_crew_run_heartbeat(db, run_id)
+                # COMPLETED and FAILED are written by the run itself as it finishes
+                if run_status == "CANCELLED":
+                    crew_runner.cancel(run_id, CANCEL_USER)
+                if run_status != "RUNNING":
+                    return
+            except Exception:
+                logger.exception("Failed to refresh heartbeat for run %s", run_id)
@@ -0,0 +1,57 @@
+"""WebSocket wire formats, negotiated per connection through the subprotocol header.
+
+JSON objects are the default. Clients that offer "crewdeck.compact.v1" instead
+receive run events as positional JSON arrays:
+
+    [type_code, seq, timestamp, *fields]
+
+with the codes and field order below. Events without a code (e.g. "connected")
+are still sent as JSON objects, so a frame starting with "{" is always a plain
+event.
+"""
+import json
+from typing import Dict, List, Optional
+
+JSON = "json"
+COMPACT = "crewdeck.compact.v1"
+SUBPROTOCOLS = (COMPACT,)
+
+# type -> (code, field order)
+EVENT_CODES = {
+    "agent_start": (1, ("agent", "task")),
+    "agent_action": (2, ("agent", "message")),
+    "tool_start": (3, ("tool", "input")),
+    "tool_end": (4, ("tool", "output")),
+    "llm_chunk": (5, ("content",)),
+    "complete": (6, ("result",)),
+    "error": (7, ("error",)),
+    "cancelled": (8, ("reason",)),
+    "restart": (9, ("message",)),
+}
+
+
+def choose_protocol(offered: List[str]) -> Optional[str]:
+    """Pick the first subprotocol the client offered that we speak; None means JSON"""
+    for protocol in offered:
+        if protocol in SUBPROTOCOLS:
+            return protocol
+    return None
+
+
+def encode(message: dict, protocol: str) -> str:
+    if protocol == COMPACT:
+        schema = EVENT_CODES.get(message.get("type"))
+        if schema:
+            code, fields = schema
+            frame = [code, message.get("seq"), message.get("timestamp")]
+            frame.extend(message.get(field) for field in fields)
+            return json.dumps(frame, separators=(",", ":"))
+    return json.dumps(message)
+
+
+def encode_cached(message: dict, protocol: str, encodings: Dict[str, str]) -> str:
+    """Encode once per protocol, sharing the result across every socket that uses it"""
+    encoded = encodings.get(protocol)
+    if encoded is None:
+        encoded = encodings[protocol] = encode(message, protocol)
+    return encoded
@@ -1,43 +1,381 @@
-from typing import Dict, List
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from collections import deque
 from fastapi import WebSocket
 from uuid import UUID
 import json
 import asyncio
+import logging
+import time
+from app.core.config import settings
+from app.core.metrics import run_events_published, ws_frames_dropped, ws_frames_sent
+from app.core.run_status_cache import TERMINAL_EVENTS, run_status_cache
+from app.services.broadcast import BroadcastBackend, create_broadcast_backend
+from app.services.event_writer import RunEventWriter, event_writer as default_event_writer
+from app.services import wire_protocol
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+
+class ClientConnection:
+    """One subscriber with its own bounded send queue and writer task.
+
+    Producers only append to the queue, so a slow or stalled client never holds
+    up the crew that emitted the event or any other viewer of the run.
+    """
+
+    def __init__(self, websocket: WebSocket, run_id: str, manager: "ConnectionManager",
+                 max_queue: int, overflow_policy: str, protocol: str = wire_protocol.JSON):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.run_id = run_id
+        self.manager = manager
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        # (message, encoded) pairs in this connection's wire format; the dict is kept so
+        # llm_chunk entries can be merged or dropped
+        self.queue: Deque[Tuple[dict, str]] = deque()
+        self.dropped = 0
+        # Forced (replayed) messages at the head of the queue; they do not count against max_queue
+        self.backlog = 0
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, message: dict, encodings: Dict[str, str], force: bool = False) -> bool:
+        """Queue a message without waiting; returns False if the client must be disconnected.
+
+        encodings caches the message per wire format and is shared by every
+        connection, so each format is encoded once. force skips the queue bound,
+        for replaying a run's backlog on connect.
+        """
+        if self._closed:
+            return False
+        if force:
+            self.backlog += 1
+        elif len(self.queue) - self.backlog >= self.max_queue:
+            if self._coalesce(message):
+                return True
+            if not self._drop_oldest_chunk():
+                # Nothing safe to discard (or policy is "disconnect"): give up on this client
+                return False
+        self.queue.append((message, wire_protocol.encode_cached(message, self.protocol, encodings)))
+        self._ready.set()
+        return True
+
+    def _coalesce(self, message: dict) -> bool:
+        """Merge an llm_chunk into a queued llm_chunk at the tail of the queue"""
+        if self.overflow_policy != "coalesce" or message.get("type") != "llm_chunk":
+            return False
+        tail, _ = self.queue[-1]
+        if len(self.queue) <= self.backlog or tail.get("type") != "llm_chunk":
+            return False
+        merged = dict(tail, content=tail["content"] + message["content"])
+        self.queue[-1] = (merged, wire_protocol.encode(merged, self.protocol))
+        ws_frames_dropped.inc("coalesced")
+        return True
+
+    def _drop_oldest_chunk(self) -> bool:
+        """Discard the oldest queued llm_chunk; other event types are never dropped"""
+        if self.overflow_policy == "disconnect":
+            return False
+        for index, (queued, _) in enumerate(self.queue):
+            if index >= self.backlog and queued.get("type") == "llm_chunk":
+                del self.queue[index]
+                self.dropped += 1
+                ws_frames_dropped.inc("overflow")
+                return True
+        return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self.queue:
+                    _, encoded = self.queue.popleft()
+                    if self.backlog:
+                        self.backlog -= 1
+                    await self.websocket.send_text(encoded)
+                    ws_frames_sent.inc()
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Connection is closed
+            self.manager.disconnect(self.websocket, self.run_id)
+
+    def close(self):
+        self._closed = True
+        self.queue.clear()
+        self.writer.cancel()
+
+
+class RunEventBuffer:
+    """Ring buffer of a run's serialized events so late joiners can catch up"""
+
+    def __init__(self, max_events: int):
+        self.max_events = max_events
+        # (seq, message, encodings) triples, oldest first; encodings always holds the JSON form
+        self.events: Deque[Tuple[int, dict, Dict[str, str]]] = deque()
+        self.last_seq = 0
+        self.size = 0  # Bytes of JSON-encoded events held (other formats are not counted)
+        self.status = "RUNNING"
+        self.completed_at: Optional[float] = None
+
+    def append(self, message: dict) -> Tuple[dict, Dict[str, str], int]:
+        """Keep a message, stamping the next sequence number unless the publisher already did.
+
+        Returns (message, encodings, net bytes added to the buffer).
+        """
+        if "seq" in message:
+            self.last_seq = message["seq"]
+        else:
+            self.last_seq += 1
+            message = dict(message, seq=self.last_seq)
+        encoded = json.dumps(message)
+        encodings = {wire_protocol.JSON: encoded}
+        self.events.append((self.last_seq, message, encodings))
+        self.size += len(encoded)
+        freed = 0
+        while len(self.events) > self.max_events:
+            freed += self.trim_oldest()
+
+        if message.get("type") in TERMINAL_EVENTS:
+            self.status = TERMINAL_EVENTS[message["type"]]
+            self.completed_at = time.monotonic()
+        return message, encodings, len(encoded) - freed
+
+    def trim_oldest(self) -> int:
+        _, _, encodings = self.events.popleft()
+        freed = len(encodings[wire_protocol.JSON])
+        self.size -= freed
+        return freed
+
+    @property
+    def first_seq(self) -> int:
+        return self.events[0][0] if self.events else self.last_seq + 1
+
+    def llm_output(self) -> Optional[str]:
+        """LLM output streamed so far, or None once early events have been trimmed"""
+        if self.first_seq != 1:
+            return None
+        return "".join(
+            message.get("content", "") for _, message, _ in self.events if message.get("type") == "llm_chunk"
+        )
+
+    def since(self, after_seq: int) -> List[Tuple[dict, Dict[str, str]]]:
+        if after_seq > self.last_seq:
+            # Resuming from a seq this buffer never reached: the client saw an earlier
+            # attempt of a restarted run, so it needs everything from the restart on
+            after_seq = 0
+        return [(message, encodings) for seq, message, encodings in self.events if seq > after_seq]
+
+
+class RunSubscriber:
+    """In-process listener on a run's events, for SSE streams and long polls.
+
+    Holds (message, encodings) pairs so the JSON each event was buffered with is
+    reused rather than re-encoded per listener. A listener that falls more than
+    max_queue events behind is marked overflowed and should end its stream.
+    """
+
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.overflowed = False
+
+    def put(self, message: dict, encodings: Dict[str, str]):
+        try:
+            self.queue.put_nowait((message, encodings))
+        except asyncio.QueueFull:
+            ws_frames_dropped.inc("sse_overflow")
+            self.overflowed = True
 
 
 class ConnectionManager:
-    def __init__(self):
-        # Map run_id to list of WebSocket connections
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(self, max_queue: int = None, overflow_policy: str = None, backend: BroadcastBackend = None):
+        # Map run_id to the connections subscribed to it
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        # Map run_id to its SSE / long-poll listeners
+        self.run_subscribers: Dict[str, Set[RunSubscriber]] = {}
+        self.max_queue = max_queue or settings.WS_SEND_QUEUE_SIZE
+        self.overflow_policy = overflow_policy or settings.WS_OVERFLOW_POLICY
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WebSocket overflow policy: {self.overflow_policy}")
+        # Recent events per run, in creation order, bounded by WS_REPLAY_MEMORY_BUDGET
+        self.run_buffers: Dict[str, RunEventBuffer] = {}
+        self.replay_bytes = 0
+        self._last_sweep = 0.0
+        # Carries events to whichever process holds the subscribers
+        self.backend = backend or create_broadcast_backend()
+        self._publish_seq: Dict[str, int] = {}
+
+    async def start(self, listen: bool = True):
+        """Connect the broadcast backend; processes without subscribers pass listen=False"""
+        await self.backend.start(self.deliver if listen else None)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    def get_run_buffer(self, run_id: str) -> Optional[RunEventBuffer]:
+        return self.run_buffers.get(run_id)
 
-    async def connect(self, websocket: WebSocket, run_id: str):
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, run_id: str, after_seq: Optional[int] = None,
+                      greeting: Optional[dict] = None):
+        """Subscribe a socket to a run and replay buffered events newer than after_seq.
+
+        The greeting (if any) is sent to this socket only, ahead of the replay.
+        Registration and replay happen without yielding, so no live event can be
+        missed or delivered twice. The wire format is negotiated from the
+        subprotocols the client offered, defaulting to JSON.
+        """
+        offered = getattr(websocket, "scope", {}).get("subprotocols", [])
+        subprotocol = wire_protocol.choose_protocol(offered)
+        if subprotocol:
+            await websocket.accept(subprotocol=subprotocol)
+        else:
+            await websocket.accept()
         if run_id not in self.active_connections:
-            self.active_connections[run_id] = []
-        self.active_connections[run_id].append(websocket)
+            self.active_connections[run_id] = {}
+        connection = ClientConnection(websocket, run_id, self, self.max_queue, self.overflow_policy,
+                                      subprotocol or wire_protocol.JSON)
+        self.active_connections[run_id][websocket] = connection
+
+        if greeting is not None:
+            connection.enqueue(greeting, {}, force=True)
+        buffer = self.run_buffers.get(run_id)
+        if buffer:
+            for message, encodings in buffer.since(after_seq or 0):
+                connection.enqueue(message, encodings, force=True)
+
+    async def send_to(self, websocket: WebSocket, run_id: str, message: dict):
+        """Send an unsequenced message to a single subscriber"""
+        connection = self.active_connections.get(run_id, {}).get(websocket)
+        if connection and not connection.enqueue(message, {}):
+            self.disconnect(websocket, run_id)
 
     def disconnect(self, websocket: WebSocket, run_id: str):
         if run_id in self.active_connections:
-            if websocket in self.active_connections[run_id]:
-                self.active_connections[run_id].remove(websocket)
+            connection = self.active_connections[run_id].pop(websocket, None)
+            if connection:
+                connection.close()
             if not self.active_connections[run_id]:
                 del self.active_connections[run_id]
 
-    async def send_personal_message(self, message: dict, run_id: str):
+    def subscribe(self, run_id: str, after_seq: Optional[int] = None
+                  ) -> Tuple[RunSubscriber, List[Tuple[dict, Dict[str, str]]]]:
+        """Listen to a run's events in-process, without a socket.
+
+        Returns the subscriber and the buffered events newer than after_seq
+        (None replays nothing). As in connect(), nothing can slip in between.
+        """
+        subscriber = RunSubscriber(self.max_queue)
+        self.run_subscribers.setdefault(run_id, set()).add(subscriber)
+        buffer = self.run_buffers.get(run_id)
+        replay = buffer.since(after_seq) if buffer and after_seq is not None else []
+        return subscriber, replay
+
+    def unsubscribe(self, run_id: str, subscriber: RunSubscriber):
+        subscribers = self.run_subscribers.get(run_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.run_subscribers[run_id]
+
+    async def send_personal_message(self, message: dict, run_id: str) -> dict:
+        """Publish a run event to every process; called by the process executing the run.
+
+        Returns the published message, stamped with its seq.
+        """
+        # Sequence numbers are assigned here so every subscriber process agrees on them
+        if message.get("type") == "restart":
+            # This process may have published the abandoned attempt itself
+            self._publish_seq.pop(run_id, None)
+        seq = self._publish_seq.get(run_id, 0) + 1
+        if message.get("type") in TERMINAL_EVENTS:
+            self._publish_seq.pop(run_id, None)
+        else:
+            self._publish_seq[run_id] = seq
+        published = dict(message, seq=seq)
+        run_events_published.inc(message.get("type", ""))
+        await self.backend.publish(run_id, published)
+        return published
+
+    def deliver(self, run_id: str, message: dict):
+        """Buffer an event and hand it to this process's subscribers"""
+        # Buffer every run event, even with nobody watching yet
+        buffer = self.run_buffers.get(run_id)
+        if message.get("type") == "restart":
+            # A new attempt numbers its events from 1 again; the old attempt's events would
+            # shadow them (last_seq, since()), so start the run's buffer over
+            self._evict_buffer(run_id)
+            buffer = None
+        if buffer is None:
+            buffer = self.run_buffers[run_id] = RunEventBuffer(settings.WS_REPLAY_MAX_EVENTS)
+        message, encodings, added = buffer.append(message)
+        self.replay_bytes += added
+        self._enforce_replay_budget()
+        # Before any listener wakes up, so status reads already see the transition
+        run_status_cache.apply_event(run_id, message)
+
+        for subscriber in self.run_subscribers.get(run_id, ()):
+            subscriber.put(message, encodings)
+
         if run_id in self.active_connections:
-            message_str = json.dumps(message)
-            # Send to all connections for this run_id
-            disconnected = []
-            for websocket in self.active_connections[run_id]:
-                try:
-                    await websocket.send_text(message_str)
-                except Exception:
-                    # Connection is closed, mark for removal
-                    disconnected.append(websocket)
+            # Hand the message to every connection's queue; nothing here waits on a socket
+            overflowed = []
+            for websocket, connection in self.active_connections[run_id].items():
+                if not connection.enqueue(message, encodings):
+                    overflowed.append(websocket)
             
-            # Remove disconnected websockets
-            for ws in disconnected:
+            # Drop clients that could not keep up
+            for ws in overflowed:
+                logger.warning("Disconnecting slow WebSocket client on run %s", run_id)
+                ws_frames_dropped.inc("slow_client")
                 self.disconnect(ws, run_id)
+                asyncio.create_task(self._close_slow_client(ws))
+
+    def buffered_output(self, run_id: str) -> Optional[str]:
+        """A run's streamed LLM output from its replay buffer, if the buffer still holds all of it"""
+        buffer = self.run_buffers.get(run_id)
+        return buffer.llm_output() if buffer else None
+
+    def _enforce_replay_budget(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= 1.0:
+            self._last_sweep = now
+            # Finished runs only need to be replayable for a short while
+            for run_id, buffer in list(self.run_buffers.items()):
+                if buffer.completed_at and now - buffer.completed_at > settings.WS_REPLAY_RETENTION_SECONDS:
+                    self._evict_buffer(run_id)
+
+        if self.replay_bytes <= settings.WS_REPLAY_MEMORY_BUDGET:
+            return
+        # Over budget: drop finished runs in the order they finished, then trim the earliest
+        # events of live runs (by when this process first saw them); live runs are never dropped
+        finished = sorted(
+            (buffer.completed_at, run_id) for run_id, buffer in self.run_buffers.items() if buffer.completed_at
+        )
+        for _, run_id in finished:
+            self._evict_buffer(run_id)
+            if self.replay_bytes <= settings.WS_REPLAY_MEMORY_BUDGET:
+                return
+        for buffer in list(self.run_buffers.values()):
+            while buffer.events and self.replay_bytes > settings.WS_REPLAY_MEMORY_BUDGET:
+                self.replay_bytes -= buffer.trim_oldest()
+            if self.replay_bytes <= settings.WS_REPLAY_MEMORY_BUDGET:
+                return
+
+    def _evict_buffer(self, run_id: str):
+        buffer = self.run_buffers.pop(run_id, None)
+        if buffer:
+            self.replay_bytes -= buffer.size
+
+    async def _close_slow_client(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=1013, reason="Client too slow")
+        except Exception:
+            pass
 
     async def broadcast_to_run(self, message: dict, run_id: str):
         await self.send_personal_message(message, run_id)
@@ -48,68 +386,129 @@ manager = ConnectionManager()
 
 
 class WebSocketCallbackHandler:
-    """Custom callback handler for CrewAI to send real-time updates via WebSocket"""
+    """Custom callback handler for CrewAI to send real-time updates via WebSocket.
+
+    Consecutive llm_chunk events are coalesced into one frame, flushed after
+    WS_CHUNK_FLUSH_INTERVAL seconds or once WS_CHUNK_MAX_BYTES are pending.
+    Any other event flushes pending chunks first, so ordering is preserved.
+    Every frame is also persisted through the batching event writer, unless
+    EVENT_PERSISTENCE_ENABLED is off.
+    """
     
-    def __init__(self, run_id: str, ws_manager: ConnectionManager):
+    def __init__(self, run_id: str, ws_manager: ConnectionManager,
+                 flush_interval: float = None, max_chunk_bytes: int = None,
+                 event_writer: Optional[RunEventWriter] = None):
         self.run_id = run_id
         self.ws_manager = ws_manager
+        if event_writer is None and settings.EVENT_PERSISTENCE_ENABLED:
+            event_writer = default_event_writer
+        self.event_writer = event_writer
+        self._run_uuid = UUID(run_id) if event_writer else None
+        self.flush_interval = settings.WS_CHUNK_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.max_chunk_bytes = settings.WS_CHUNK_MAX_BYTES if max_chunk_bytes is None else max_chunk_bytes
+        self._pending_chunks: List[str] = []
+        self._pending_bytes = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Serializes frames so a timer flush cannot overtake a later event
+        self._send_lock = asyncio.Lock()
+        # Coalescing metrics
+        self.chunks_received = 0
+        self.frames_sent = 0
+
+    async def _send(self, message: dict):
+        """Send one frame; callers hold _send_lock"""
+        message["timestamp"] = asyncio.get_running_loop().time()
+        self.frames_sent += 1
+        published = await self.ws_manager.send_personal_message(message, self.run_id)
+        if self.event_writer:
+            self.event_writer.add(self._run_uuid, published)
+
+    async def _flush_pending(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending_chunks:
+            return
+        content = "".join(self._pending_chunks)
+        self._pending_chunks = []
+        self._pending_bytes = 0
+        await self._send({"type": "llm_chunk", "content": content})
+
+    async def flush(self):
+        """Send any coalesced llm_chunk content now"""
+        async with self._send_lock:
+            await self._flush_pending()
+
+    async def _emit(self, message: dict):
+        async with self._send_lock:
+            await self._flush_pending()
+            await self._send(message)
+
+    def _on_flush_timer(self):
+        self._flush_handle = None
+        asyncio.ensure_future(self.flush())
 
     async def on_agent_start(self, agent_name: str, task: str):
-        message = {
+        await self._emit({
             "type": "agent_start",
             "agent": agent_name,
-            "task": task,
-            "timestamp": asyncio.get_event_loop().time()
-        }
-        await self.ws_manager.send_personal_message(message, self.run_id)
+            "task": task
+        })
 
     async def on_agent_action(self, agent_name: str, action: str):
-        message = {
+        await self._emit({
             "type": "agent_action",
             "agent": agent_name,
-            "message": action,
-            "timestamp": asyncio.get_event_loop().time()
-        }
-        await self.ws_manager.send_personal_message(message, self.run_id)
+            "message": action
+        })
 
     async def on_tool_start(self, tool_name: str, input_data: str):
-        message = {
+        await self._emit({
             "type": "tool_start",
             "tool": tool_name,
-            "input": input_data,
-            "timestamp": asyncio.get_event_loop().time()
-        }
-        await self.ws_manager.send_personal_message(message, self.run_id)
+            "input": input_data
+        })
 
     async def on_tool_end(self, tool_name: str, output: str):
-        message = {
+        await self._emit({
             "type": "tool_end",
             "tool": tool_name,
-            "output": output,
-            "timestamp": asyncio.get_event_loop().time()
-        }
-        await self.ws_manager.send_personal_message(message, self.run_id)
+            "output": output
+        })
 
     async def on_llm_chunk(self, content: str):
-        message = {
-            "type": "llm_chunk",
-            "content": content,
-            "timestamp": asyncio.get_event_loop().time()
-        }
-        await self.ws_manager.send_personal_message(message, self.run_id)
+        self.chunks_received += 1
+        if self.flush_interval <= 0:
+            await self._emit({"type": "llm_chunk", "content": content})
+            return
+        
+        self._pending_chunks.append(content)
+        self._pending_bytes += len(content.encode())
+        if self._pending_bytes >= self.max_chunk_bytes:
+            await self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self._on_flush_timer)
 
     async def on_task_complete(self, result: str):
-        message = {
+        await self._emit({
             "type": "complete",
-            "result": result,
-            "timestamp": asyncio.get_event_loop().time()
-        }
-        await self.ws_manager.send_personal_message(message, self.run_id)
+            "result": result
+        })
 
     async def on_error(self, error: str):
-        message = {
+        await self._emit({
             "type": "error",
-            "error": error,
-            "timestamp": asyncio.get_event_loop().time()
-        }
-        await self.ws_manager.send_personal_message(message, self.run_id)
\ No newline at end of file
+            "error": error
+        })
+
+    async def on_restart(self):
+        await self._emit({
+            "type": "restart",
+            "message": "Run restarted after its previous worker stopped responding"
+        })
+
+    async def on_cancelled(self, reason: str):
+        await self._emit({
+            "type": "cancelled",
+            "reason": reason
+        })
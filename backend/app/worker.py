@@ -0,0 +1,48 @@
+"""Standalone crew run worker.
+
+Scales independently of the API: start as many of these as needed with
+
+    python -m app.worker --concurrency 8 --metrics-port 9100
+
+Run metrics (durations, queue waits, published events) are recorded in the
+worker that executes the run, so each worker is its own Prometheus target.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+from app.core.config import settings
+from app.services.crew_runner import crew_runner
+from app.services.event_writer import event_writer
+from app.services.process_metrics import start_metrics_server
+from app.services.run_worker import RunWorker
+from app.services.ws_manager import manager
+
+
+async def main(concurrency: int, metrics_port: int):
+    # Workers exist to execute crews, so import them before claiming the first run
+    crew_runner.preload()
+    # Events are published for the API processes; nobody subscribes here
+    await manager.start(listen=False)
+    # Run durations, queue waits and published events are only recorded here
+    metrics_server = await start_metrics_server(metrics_port)
+    worker = RunWorker(manager, concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run_forever()
+    if metrics_server:
+        metrics_server.close()
+    await event_writer.stop()
+    await manager.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drain the CrewDeck run queue")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY)
+    parser.add_argument("--metrics-port", type=int, default=settings.WORKER_METRICS_PORT,
+                        help="Serve Prometheus metrics on this port (0 disables)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(args.concurrency, args.metrics_port))
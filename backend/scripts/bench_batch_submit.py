@@ -0,0 +1,92 @@
+"""Compare run submission and status lookup throughput: per-item vs batch endpoints.
+
+Against a live backend:
+
+    python scripts/bench_batch_submit.py --url http://localhost:8000 --crew-id 2 --runs 500 --batch-size 100
+
+Each case needs runs * credits_required credits. With --grant the script tops
+up its account directly in the database (needs DATABASE_URL), otherwise the
+account named by --email must already hold enough credits.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_latency import get_token, timed_request
+
+
+def request_json(url, headers, data=None):
+    with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=120) as response:
+        return json.loads(response.read())
+
+
+def grant_credits(email, credits):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.db.models import User
+    from app.db.session import SessionLocal
+    with SessionLocal() as db:
+        db.query(User).filter(User.email == email).update({User.credits: credits})
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--crew-id", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20, help="Parallel requests on the per-item path")
+    parser.add_argument("--email", default="batch-bench@example.com")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--grant", action="store_true", help="Top up the account's credits in the database first")
+    args = parser.parse_args()
+
+    token = get_token(args.url, args.email, args.password)
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    crews = request_json(f"{args.url}/api/v1/crews/", headers)
+    cost = next(crew["credits_required"] for crew in crews if crew["id"] == args.crew_id)
+    if args.grant:
+        grant_credits(args.email, 2 * args.runs * cost)
+    inputs = [{"inputs": {"topic": f"batch bench {index}"}} for index in range(args.runs)]
+
+    # Per-item: one POST /run per run
+    url = f"{args.url}/api/v1/crews/{args.crew_id}/run"
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda item: timed_request(url, headers, json.dumps(item).encode()), inputs))
+    per_item = time.perf_counter() - start
+    failed = sum(1 for _, status in results if status != 200)
+    print(f"per-item submit: {args.runs} runs in {per_item:.2f}s -> {args.runs / per_item:.0f} runs/s ({failed} failed)")
+
+    # Batch: one POST /runs:batch per batch_size runs
+    url = f"{args.url}/api/v1/crews/{args.crew_id}/runs:batch"
+    run_ids = []
+    start = time.perf_counter()
+    for offset in range(0, args.runs, args.batch_size):
+        body = json.dumps({"items": inputs[offset:offset + args.batch_size]}).encode()
+        run_ids += [run["id"] for run in request_json(url, headers, body)["items"]]
+    batched = time.perf_counter() - start
+    print(f"batch submit:    {len(run_ids)} runs in {batched:.2f}s -> {len(run_ids) / batched:.0f} runs/s "
+          f"({per_item / batched:.1f}x)")
+
+    # Status lookups for the batch-created runs
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda run_id: timed_request(f"{args.url}/api/v1/crews/runs/{run_id}", headers), run_ids))
+    per_item = time.perf_counter() - start
+    start = time.perf_counter()
+    for offset in range(0, len(run_ids), args.batch_size):
+        ids = ",".join(run_ids[offset:offset + args.batch_size])
+        request_json(f"{args.url}/api/v1/crews/runs:batch?ids={ids}", headers)
+    batched = time.perf_counter() - start
+    print(f"per-item status: {len(run_ids)} lookups in {per_item:.2f}s -> {len(run_ids) / per_item:.0f}/s")
+    print(f"batch status:    {len(run_ids)} lookups in {batched:.2f}s -> {len(run_ids) / batched:.0f}/s "
+          f"({per_item / batched:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Measure end-to-end event latency through the Postgres broadcast backend.
+
+Starts one publisher and several subscriber processes, each with its own
+ConnectionManager, like separate uvicorn workers. Needs DATABASE_URL to point
+at a reachable Postgres:
+
+    cd backend && python scripts/bench_broadcast.py --workers 4 --events 1000
+
+Latency is measured from just before publish to the subscriber's socket write,
+using the shared wall clock of the host.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.broadcast import PostgresBroadcast  # noqa: E402
+from app.services.ws_manager import ConnectionManager  # noqa: E402
+
+RUN_ID = "broadcast-bench"
+
+
+class RecordingWebSocket:
+    def __init__(self, expected: int, done: asyncio.Event):
+        self.latencies = []
+        self.expected = expected
+        self.done = done
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        message = json.loads(text)
+        if message.get("type") == "bench":
+            self.latencies.append(time.time() - message["sent"])
+            if len(self.latencies) >= self.expected:
+                self.done.set()
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+def subscriber(events: int, ready, results):
+    async def run():
+        manager = ConnectionManager(backend=PostgresBroadcast())
+        await manager.start()
+        done = asyncio.Event()
+        ws = RecordingWebSocket(events, done)
+        await manager.connect(ws, RUN_ID)
+        ready.release()
+        try:
+            await asyncio.wait_for(done.wait(), timeout=120)
+        except asyncio.TimeoutError:
+            pass
+        await manager.stop()
+        results.put(ws.latencies)
+
+    asyncio.run(run())
+
+
+async def publish(events: int, interval: float, payload_size: int):
+    manager = ConnectionManager(backend=PostgresBroadcast())
+    await manager.start(listen=False)
+    filler = "x" * payload_size
+    for _ in range(events):
+        await manager.send_personal_message({"type": "bench", "sent": time.time(), "content": filler}, RUN_ID)
+        if interval:
+            await asyncio.sleep(interval)
+    await manager.stop()
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    if not samples:
+        return 0.0
+    return samples[max(0, min(len(samples) - 1, int(round(pct / 100.0 * len(samples))) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--interval", type=float, default=0.001)
+    parser.add_argument("--payload-size", type=int, default=100)
+    args = parser.parse_args()
+
+    ready = multiprocessing.Semaphore(0)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=subscriber, args=(args.events, ready, results))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+
+    start = time.time()
+    asyncio.run(publish(args.events, args.interval, args.payload_size))
+    publish_seconds = time.time() - start
+
+    latencies = []
+    received = []
+    for _ in processes:
+        worker_latencies = results.get()
+        received.append(len(worker_latencies))
+        latencies.extend(worker_latencies)
+    for process in processes:
+        process.join()
+
+    ms = lambda value: value * 1000  # noqa: E731
+    print(f"{args.events} events to {args.workers} worker processes in {publish_seconds:.2f}s "
+          f"({args.events / publish_seconds:.0f} events/s published)")
+    print(f"  received per worker: {received}")
+    for pct in (50, 95, 99):
+        print(f"  p{pct}: {ms(percentile(latencies, pct)):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
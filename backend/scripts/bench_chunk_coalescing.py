@@ -0,0 +1,80 @@
+"""Compare llm_chunk frame counts and CPU with and without coalescing.
+
+Streams synthetic tokens through WebSocketCallbackHandler to a few fake
+subscribers, in-process:
+
+    cd backend && python scripts/bench_chunk_coalescing.py --tokens 20000 --subscribers 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.ws_manager import ConnectionManager, WebSocketCallbackHandler  # noqa: E402
+
+# Measure WebSocket delivery only; run event persistence needs a database
+settings.EVENT_PERSISTENCE_ENABLED = False
+
+
+class CountingWebSocket:
+    def __init__(self):
+        self.frames = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.frames += 1
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+async def run_case(label, tokens, tokens_per_ms, subscribers, flush_interval, max_bytes):
+    manager = ConnectionManager(max_queue=100000)
+    await manager.start()
+    sockets = [CountingWebSocket() for _ in range(subscribers)]
+    for ws in sockets:
+        await manager.connect(ws, "bench")
+    handler = WebSocketCallbackHandler("bench", manager, flush_interval=flush_interval, max_chunk_bytes=max_bytes)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for index in range(tokens):
+        await handler.on_llm_chunk(" token")
+        if index % tokens_per_ms == 0:
+            await asyncio.sleep(0.001)
+    await handler.on_task_complete("done")
+    await asyncio.sleep(0.1)  # Let writers drain
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    delivered = sum(ws.frames for ws in sockets)
+    for ws in list(manager.active_connections.get("bench", {})):
+        manager.disconnect(ws, "bench")
+    print(f"{label:>12}: {handler.chunks_received} chunks -> {handler.frames_sent} frames published, "
+          f"{delivered} frames delivered, CPU {cpu * 1000:.0f} ms over {wall:.2f}s wall")
+    return handler.frames_sent, cpu
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--tokens-per-ms", type=int, default=20)
+    parser.add_argument("--subscribers", type=int, default=10)
+    parser.add_argument("--flush-interval", type=float, default=0.03)
+    parser.add_argument("--max-bytes", type=int, default=4096)
+    args = parser.parse_args()
+
+    frames_off, cpu_off = await run_case("uncoalesced", args.tokens, args.tokens_per_ms, args.subscribers, 0, args.max_bytes)
+    frames_on, cpu_on = await run_case("coalesced", args.tokens, args.tokens_per_ms, args.subscribers,
+                                       args.flush_interval, args.max_bytes)
+    print(f"frame reduction: {frames_off / max(frames_on, 1):.1f}x, CPU reduction: {cpu_off / max(cpu_on, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Fire many parallel run submissions at one account and check for overdraft.
+
+Against a live backend with a fresh account (20 credits by default):
+
+    python scripts/bench_credit_race.py --url http://localhost:8000 --crew-id 2 --submissions 500
+
+The script exits non-zero if more runs were accepted than the balance allows,
+or if the final balance does not match the accepted runs. It also reports
+accepted submissions per second.
+"""
+import argparse
+import json
+import sys
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_latency import get_token, timed_request
+
+
+def get_json(url, headers):
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--crew-id", type=int, default=2)
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    # A new account each time so the starting balance is known
+    email = f"race-{uuid.uuid4().hex[:8]}@example.com"
+    token = get_token(args.url, email, "race-password")
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+    crews = get_json(f"{args.url}/api/v1/crews/", headers)
+    cost = next(crew["credits_required"] for crew in crews if crew["id"] == args.crew_id)
+    starting_credits = get_json(f"{args.url}/api/v1/auth/me", headers)["credits"]
+
+    url = f"{args.url}/api/v1/crews/{args.crew_id}/run"
+    body = json.dumps({"inputs": {"topic": "race"}}).encode()
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: timed_request(url, headers, body), range(args.submissions)))
+    wall = time.perf_counter() - wall_start
+
+    accepted = sum(1 for _, status in results if status == 200)
+    rejected = sum(1 for _, status in results if status == 400)
+    errors = len(results) - accepted - rejected
+    final_credits = get_json(f"{args.url}/api/v1/auth/me", headers)["credits"]
+
+    print(f"{args.submissions} submissions at concurrency {args.concurrency}, cost {cost}, start balance {starting_credits}")
+    print(f"  accepted: {accepted}, rejected: {rejected}, errors: {errors}")
+    print(f"  final balance: {final_credits}")
+    print(f"  throughput: {args.submissions / wall:.1f} submissions/s, {accepted / wall:.1f} runs/s")
+
+    expected_runs = starting_credits // cost
+    if accepted > expected_runs or final_credits != starting_credits - accepted * cost or final_credits < 0:
+        print("FAIL: credits were overdrawn or do not match accepted runs")
+        sys.exit(1)
+    print("OK: no overdraft")
+
+
+if __name__ == "__main__":
+    main()
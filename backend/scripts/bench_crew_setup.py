@@ -0,0 +1,108 @@
+"""Measure per-run crew setup cost: time and allocations to get agents and tasks ready.
+
+Needs the crew dependencies (crewai, crewai-tools) installed:
+
+    cd backend && python scripts/bench_crew_setup.py --runs 200
+
+"fresh" reproduces the old per-run setup: new tool instances for every run
+plus agent/task construction. "templates" is what the crews do now: bind the
+run's inputs to the module-level templates and reuse the shared tools. Both
+include creating the run's LLM wrapper, which stays per run.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.cached_tools import CachedSerperDevTool, CachedScrapeWebsiteTool  # noqa: E402
+from app.core.cerebras_llm import get_cerebras_llm  # noqa: E402
+from app.crews import blog_writer, market_researcher, travel_planner  # noqa: E402
+
+INPUTS = {
+    "topic": "AI chips",
+    "tone": "professional",
+    "target_audience": "business professionals",
+    "destination": "Lisbon, Portugal",
+    "duration": "5 days",
+    "budget": "$2500",
+    "interests": "food, history",
+}
+
+
+def setup_market_researcher(fresh: bool):
+    llm = get_cerebras_llm()
+    if fresh:
+        market_researcher.RESEARCHER.tools = [CachedSerperDevTool(), CachedScrapeWebsiteTool()]
+    researcher = market_researcher.RESEARCHER.build(llm, **INPUTS)
+    analyst = market_researcher.ANALYST.build(llm)
+    return [
+        market_researcher.RESEARCH_TASK.build(researcher, **INPUTS),
+        market_researcher.ANALYSIS_TASK.build(analyst, **INPUTS),
+    ]
+
+
+def setup_blog_writer(fresh: bool):
+    llm = get_cerebras_llm()
+    if fresh:
+        blog_writer.STRATEGIST.tools = [CachedSerperDevTool()]
+    return [
+        blog_writer.STRATEGIST.build(llm, **INPUTS),
+        blog_writer.WRITER.build(llm, **INPUTS),
+        blog_writer.EDITOR.build(llm),
+    ]
+
+
+def setup_travel_planner(fresh: bool):
+    llm = get_cerebras_llm()
+    if fresh:
+        travel_planner.PLANNER.tools = [CachedSerperDevTool()]
+    planner = travel_planner.PLANNER.build(llm, **INPUTS)
+    return [travel_planner.PLANNING_TASK.build(planner, **INPUTS)]
+
+
+CREWS = {
+    "market_researcher": (setup_market_researcher, market_researcher.RESEARCHER),
+    "blog_writer": (setup_blog_writer, blog_writer.STRATEGIST),
+    "travel_planner": (setup_travel_planner, travel_planner.PLANNER),
+}
+
+
+def measure(setup, fresh: bool, runs: int):
+    setup(fresh)  # warm up imports and pydantic validators
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        setup(fresh)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    setup(fresh)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    return statistics.median(latencies), max(latencies), blocks, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200, help="Setups timed per crew and mode")
+    args = parser.parse_args()
+
+    print(f"{'crew':<18} {'mode':<10} {'p50 ms':>8} {'max ms':>8} {'blocks':>8} {'KiB':>8}")
+    for name, (setup, template) in CREWS.items():
+        shared_tools = template.tools
+        for mode in ("fresh", "templates"):
+            p50, worst, blocks, size = measure(setup, mode == "fresh", args.runs)
+            template.tools = shared_tools
+            print(f"{name:<18} {mode:<10} {p50:8.2f} {worst:8.2f} {blocks:8d} {size / 1024:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
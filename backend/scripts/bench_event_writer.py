@@ -0,0 +1,93 @@
+"""Measure crew_run_events write throughput: batched writer vs one INSERT per event.
+
+Needs DATABASE_URL to point at a migrated Postgres with at least one crew.
+A throwaway user and runs are created and removed again:
+
+    cd backend && python scripts/bench_event_writer.py --events 20000 --runs 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+from app.db.models import Crew, CrewRun, CrewRunEvent, User  # noqa: E402
+from app.db.session import AsyncSessionLocal, async_engine  # noqa: E402
+from app.services.event_writer import RunEventWriter  # noqa: E402
+
+
+async def create_runs(count: int):
+    async with AsyncSessionLocal() as db:
+        crew_id = await db.scalar(select(Crew.id).limit(1))
+        if crew_id is None:
+            raise SystemExit("No crews in the database; seed them first")
+        user = User(id=uuid.uuid4(), email=f"bench-{uuid.uuid4().hex[:8]}@example.com", hashed_password="x", credits=0)
+        db.add(user)
+        runs = [CrewRun(id=uuid.uuid4(), user_id=user.id, crew_id=crew_id, inputs={}, status="RUNNING") for _ in range(count)]
+        db.add_all(runs)
+        await db.commit()
+        return user.id, [run.id for run in runs]
+
+
+async def drop_runs(user_id, run_ids):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(CrewRunEvent).where(CrewRunEvent.run_id.in_(run_ids)))
+        await db.execute(delete(CrewRun).where(CrewRun.id.in_(run_ids)))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+
+def make_event(seq: int) -> dict:
+    return {"type": "llm_chunk", "content": " token" * 8, "timestamp": time.time(), "seq": seq}
+
+
+async def run_batched(run_ids, events: int, batch_size: int):
+    writer = RunEventWriter(batch_size=batch_size)
+    start = time.perf_counter()
+    for index in range(events):
+        writer.add(run_ids[index % len(run_ids)], make_event(index // len(run_ids) + 1))
+        if index % batch_size == 0:
+            # Let scheduled flushes run, as they would between real callbacks
+            await asyncio.sleep(0)
+    await writer.stop()
+    return time.perf_counter() - start, writer.stats()
+
+
+async def run_per_event(run_ids, events: int):
+    start = time.perf_counter()
+    for index in range(events):
+        event = make_event(index // len(run_ids) + 1)
+        async with async_engine.begin() as conn:
+            await conn.execute(insert(CrewRunEvent).values(
+                run_id=run_ids[index % len(run_ids)], seq=event["seq"], type=event["type"],
+                payload={"content": event["content"], "timestamp": event["timestamp"]}
+            ))
+    return time.perf_counter() - start
+
+
+async def main(events: int, runs: int, batch_size: int, baseline_events: int):
+    user_id, run_ids = await create_runs(runs)
+    try:
+        elapsed, stats = await run_batched(run_ids, events, batch_size)
+        print(f"batched:   {events} events in {elapsed:.2f}s -> {events / elapsed:,.0f} events/s "
+              f"({stats['batches_written']} INSERTs, {stats['events_dropped']} dropped)")
+        if baseline_events:
+            elapsed = await run_per_event(run_ids, baseline_events)
+            print(f"per-event: {baseline_events} events in {elapsed:.2f}s -> {baseline_events / elapsed:,.0f} events/s")
+    finally:
+        await drop_runs(user_id, run_ids)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=10, help="Concurrent runs the events are spread over")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--baseline-events", type=int, default=2000, help="Events for the one-INSERT-per-event comparison; 0 skips it")
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.runs, args.batch_size, args.baseline_events))
@@ -0,0 +1,164 @@
+"""Simulate run scheduling under skewed load: FIFO claims vs the fair-share policy.
+
+A discrete-event simulation of the run queue, no database needed. It replays
+the claim policy from claim_next_crew_run (virtual finish time
+(executing + k) / plan weight, per-user, per-crew and global caps) against the
+old oldest-first claim with only the global cap:
+
+    cd backend && python scripts/bench_fair_share.py --heavy-runs 200 --light-users 20
+
+One heavy user queues --heavy-runs market research runs at t=0 while light
+users (one on the "pro" plan) trickle in a few runs each.
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+
+# Mean execution seconds per crew
+CREW_DURATIONS = {"market_research_crew": 60.0, "blog_writer_crew": 40.0, "travel_planner_crew": 30.0}
+
+
+class Run:
+    def __init__(self, index, user, plan, crew, submitted, duration):
+        self.index = index
+        self.user = user
+        self.plan = plan
+        self.crew = crew
+        self.submitted = submitted
+        self.duration = duration
+        self.started = None
+
+
+def make_workload(heavy_runs, light_users, light_runs, seed):
+    rng = random.Random(seed)
+    runs = []
+
+    def add(user, plan, crew, submitted):
+        duration = rng.lognormvariate(0, 0.4) * CREW_DURATIONS[crew]
+        runs.append(Run(len(runs), user, plan, crew, submitted, duration))
+
+    for _ in range(heavy_runs):
+        add("heavy", "free", "market_research_crew", 0.0)
+    for index in range(light_users):
+        plan = "pro" if index == 0 else "free"
+        for _ in range(light_runs):
+            add(f"light-{index}", plan, rng.choice(list(CREW_DURATIONS)), rng.uniform(0, 120))
+    return runs
+
+
+def pick_fifo(queue, executing, by_user, by_crew, caps):
+    return min(queue, key=lambda run: (run.submitted, run.index))
+
+
+def pick_fair_share(queue, executing, by_user, by_crew, caps):
+    # Mirrors _fair_share_queue: each user's k-th queued run finishes at (executing + k) / weight
+    position = defaultdict(int)
+    best, best_key = None, None
+    for run in sorted(queue, key=lambda run: (run.submitted, run.index)):
+        position[run.user] += 1
+        if by_user[run.user] >= caps["user"] or by_crew[run.crew] >= caps["crew"]:
+            continue
+        weight = settings.PLAN_WEIGHTS.get(run.plan, 1)
+        key = ((by_user[run.user] + position[run.user]) / weight, run.submitted, run.index)
+        if best_key is None or key < best_key:
+            best, best_key = run, key
+    return best
+
+
+def simulate(runs, policy, caps):
+    arrivals = sorted(runs, key=lambda run: run.submitted)
+    queue, finished = [], []
+    completions = []  # (time, index, run)
+    by_user, by_crew = defaultdict(int), defaultdict(int)
+    executing = 0
+    peak_crew = defaultdict(int)
+    # Claims made while a light user had a run waiting, and how many of them went to the heavy user
+    contended = {"claims": 0, "heavy": 0}
+    now, next_arrival = 0.0, 0
+    for run in runs:
+        run.started = None
+
+    while next_arrival < len(arrivals) or queue or completions:
+        # Advance to the next arrival or completion
+        next_times = []
+        if next_arrival < len(arrivals):
+            next_times.append(arrivals[next_arrival].submitted)
+        if completions:
+            next_times.append(completions[0][0])
+        now = min(next_times)
+        while next_arrival < len(arrivals) and arrivals[next_arrival].submitted <= now:
+            queue.append(arrivals[next_arrival])
+            next_arrival += 1
+        while completions and completions[0][0] <= now:
+            _, _, run = heapq.heappop(completions)
+            executing -= 1
+            by_user[run.user] -= 1
+            by_crew[run.crew] -= 1
+            finished.append(run)
+        # Workers claim until the policy has nothing that may start
+        while queue and executing < caps["global"]:
+            run = policy(queue, executing, by_user, by_crew, caps)
+            if run is None:
+                break
+            if any(queued.user != "heavy" for queued in queue):
+                contended["claims"] += 1
+                contended["heavy"] += run.user == "heavy"
+            queue.remove(run)
+            run.started = now
+            executing += 1
+            by_user[run.user] += 1
+            by_crew[run.crew] += 1
+            peak_crew[run.crew] = max(peak_crew[run.crew], by_crew[run.crew])
+            heapq.heappush(completions, (now + run.duration, run.index, run))
+    return now, finished, peak_crew, contended
+
+
+def report(label, makespan, finished, peak_crew, contended):
+    waits = defaultdict(list)
+    for run in finished:
+        waits[run.user].append(run.started - run.submitted)
+    light = sorted(wait for user, values in waits.items() if user != "heavy" for wait in values)
+    heavy = sorted(waits["heavy"])
+    pro = statistics.mean(waits["light-0"])
+    free = statistics.mean(wait for user, values in waits.items() if user not in ("heavy", "light-0") for wait in values)
+    print(f"{label}:")
+    print(f"  throughput: {len(finished) / makespan * 60:.1f} runs/min, makespan {makespan:.0f}s")
+    print(f"  light users wait p50 {statistics.median(light):.0f}s, p95 {light[int(0.95 * (len(light) - 1))]:.0f}s")
+    print(f"  heavy user  wait p50 {statistics.median(heavy):.0f}s, p95 {heavy[int(0.95 * (len(heavy) - 1))]:.0f}s")
+    print(f"  light users mean wait: pro plan {pro:.0f}s, free plan {free:.0f}s")
+    if contended["claims"]:
+        print(f"  claims going to the heavy user while light users waited: "
+              f"{contended['heavy']}/{contended['claims']} ({contended['heavy'] / contended['claims']:.0%})")
+    print(f"  peak executing per crew: {dict(peak_crew)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--heavy-runs", type=int, default=200)
+    parser.add_argument("--light-users", type=int, default=20)
+    parser.add_argument("--light-runs", type=int, default=5, help="Runs per light user")
+    parser.add_argument("--global-cap", type=int, default=settings.RUN_MAX_EXECUTING)
+    parser.add_argument("--user-cap", type=int, default=settings.RUN_MAX_PER_USER)
+    parser.add_argument("--crew-cap", type=int, default=settings.RUN_MAX_PER_CREW)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    runs = make_workload(args.heavy_runs, args.light_users, args.light_runs, args.seed)
+    fifo_caps = {"global": args.global_cap, "user": float("inf"), "crew": float("inf")}
+    fair_caps = {"global": args.global_cap, "user": args.user_cap, "crew": args.crew_cap}
+    uncapped = {"global": args.global_cap, "user": float("inf"), "crew": args.crew_cap}
+    report("fifo (before)", *simulate(runs, pick_fifo, fifo_caps))
+    report(f"fair share, user cap {args.user_cap}, crew cap {args.crew_cap}", *simulate(runs, pick_fair_share, fair_caps))
+    report(f"fair share, no user cap, crew cap {args.crew_cap}", *simulate(runs, pick_fair_share, uncapped))
+
+
+if __name__ == "__main__":
+    main()
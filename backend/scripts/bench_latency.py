@@ -0,0 +1,102 @@
+"""Measure API latency percentiles under concurrent load.
+
+Run against a live backend, once on the commit before a change and once after,
+and compare the reported p50/p95/p99:
+
+    python scripts/bench_latency.py --url http://localhost:8000 --concurrency 50 --requests 2000
+
+With --login every request is a POST /auth/token, which exercises bcrypt. Restart
+the API with PASSWORD_HASH_WORKERS=1, 2, 4, ... to see login throughput scale
+with cores (429s are counted separately as rejected requests).
+
+Only the standard library is used so the script runs anywhere the API is reachable.
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, int(round(pct / 100.0 * len(samples))) - 1))
+    return samples[index]
+
+
+def get_token(base_url, email, password):
+    """Sign up (if needed) and log in, returning a bearer token"""
+    body = json.dumps({"email": email, "password": password}).encode()
+    headers = {"Content-Type": "application/json"}
+    try:
+        urllib.request.urlopen(urllib.request.Request(
+            f"{base_url}/api/v1/auth/signup", data=body, headers=headers
+        ))
+    except urllib.error.HTTPError:
+        pass  # Already registered
+    response = urllib.request.urlopen(urllib.request.Request(
+        f"{base_url}/api/v1/auth/token", data=body, headers=headers
+    ))
+    return json.loads(response.read())["access_token"]
+
+
+def timed_request(url, headers, data=None):
+    """Issue a single request and return (latency_seconds, status_code)"""
+    start = time.perf_counter()
+    try:
+        request = urllib.request.Request(url, data=data, headers=headers)
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return time.perf_counter() - start, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/v1/auth/me", help="Endpoint to load (authenticated)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--email", default="bench@example.com")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--login", action="store_true", help="Benchmark POST /auth/token instead")
+    args = parser.parse_args()
+
+    token = get_token(args.url, args.email, args.password)
+    if args.login:
+        path = "/api/v1/auth/token"
+        headers = {"Content-Type": "application/json"}
+        data = json.dumps({"email": args.email, "password": args.password}).encode()
+    else:
+        path = args.path
+        headers = {"Authorization": f"Bearer {token}"}
+        data = None
+    url = f"{args.url}{path}"
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: timed_request(url, headers, data), range(args.requests)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    succeeded = sum(1 for _, status in results if status == 200)
+    rejected = sum(1 for _, status in results if status == 429)
+    errors = len(results) - succeeded - rejected
+
+    print(f"{args.requests} requests to {path} at concurrency {args.concurrency}")
+    print(f"  throughput: {succeeded / wall:.1f} ok req/s, rejected (429): {rejected}, errors: {errors}")
+    print(f"  mean: {statistics.mean(latencies):.1f} ms")
+    for pct in (50, 95, 99):
+        print(f"  p{pct}: {percentile(latencies, pct):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Measure the hot-path cost of the /metrics instrumentation.
+
+Times the primitives the request path and the event fan-out call
+(Histogram.observe, Counter.inc), then serves GET /health in-process through
+the full app with and without MetricsMiddleware, and times one scrape at a
+realistic number of series. Needs no database:
+
+    cd backend && python scripts/bench_metrics.py --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import timeit
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.metrics import Counter, Histogram, MetricsMiddleware, metrics  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def bench_primitives(n: int):
+    histogram = Histogram("bench_seconds", "bench", ("method", "route", "status"))
+    counter = Counter("bench_total", "bench", ("type",))
+    observe = timeit.timeit(lambda: histogram.observe(0.012, "GET", "/api/v1/crews/runs/{run_id}", "200"), number=n)
+    inc = timeit.timeit(lambda: counter.inc("llm_chunk"), number=n)
+    baseline = timeit.timeit(lambda: None, number=n)
+    print(f"Histogram.observe  {(observe - baseline) / n * 1e9:7.0f} ns")
+    print(f"Counter.inc        {(inc - baseline) / n * 1e9:7.0f} ns")
+
+
+async def serve(asgi_app, requests: int) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://bench") as client:
+        for _ in range(200):
+            await client.get("/health")
+        started = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/health")
+        return (time.perf_counter() - started) / requests
+
+
+def strip_metrics(stack):
+    """Splice MetricsMiddleware out of a built middleware stack"""
+    node = stack
+    while not isinstance(node.app, MetricsMiddleware):
+        node = node.app
+    node.app = node.app.app
+    return stack
+
+
+async def bench_middleware(requests: int, rounds: int):
+    instrumented = app.build_middleware_stack()
+    bare = strip_metrics(app.build_middleware_stack())
+    with_metrics, without_metrics = [], []
+    for _ in range(rounds):
+        without_metrics.append(await serve(bare, requests))
+        with_metrics.append(await serve(instrumented, requests))
+    best_with, best_without = min(with_metrics), min(without_metrics)
+    print(f"GET /health without metrics  {best_without * 1e6:7.1f} us/request")
+    print(f"GET /health with metrics     {best_with * 1e6:7.1f} us/request "
+          f"(+{(best_with - best_without) * 1e6:.1f} us)")
+
+
+def bench_scrape(routes: int, crews: int):
+    http = next(metric for metric in metrics._metrics if metric.name.endswith("http_request_duration_seconds"))
+    runs = next(metric for metric in metrics._metrics if metric.name.endswith("crew_run_duration_seconds"))
+    for route in range(routes):
+        for status in ("200", "404", "500"):
+            http.observe(0.02, "GET", f"/route/{route}", status)
+    for crew in range(crews):
+        for status in ("COMPLETED", "FAILED", "CANCELLED"):
+            runs.observe(60.0, f"crew_{crew}", status)
+    started = time.perf_counter()
+    body = metrics.render()
+    elapsed = time.perf_counter() - started
+    print(f"scrape: {len(body.splitlines())} lines, {len(body) / 1024:.0f} KiB in {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1_000_000, help="Calls per primitive")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per middleware round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--routes", type=int, default=40, help="Routes observed before timing a scrape")
+    parser.add_argument("--crews", type=int, default=10)
+    args = parser.parse_args()
+    bench_primitives(args.iterations)
+    asyncio.run(bench_middleware(args.requests, args.rounds))
+    bench_scrape(args.routes, args.crews)
@@ -0,0 +1,122 @@
+"""Compare run-history page fetch times: keyset cursor vs OFFSET, at growing depth.
+
+Seeds crew_runs for one throwaway user with INSERT ... SELECT generate_series,
+then times the page query GET /crews/runs issues against its OFFSET equivalent.
+Needs DATABASE_URL to point at a migrated Postgres with at least one crew:
+
+    cd backend && python scripts/bench_run_history.py --rows 10000000 --page-size 20
+
+Seeding 10M rows takes a few minutes; pass --keep to reuse them with --user-id.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, select, text  # noqa: E402
+from app.crud.crew import get_user_crew_runs  # noqa: E402
+from app.db.models import Crew, CrewRun, User  # noqa: E402
+from app.db.session import AsyncSessionLocal, async_engine  # noqa: E402
+
+SEED_SQL = text("""
+    INSERT INTO crew_runs (id, user_id, crew_id, inputs, status, created_at, completed_at)
+    SELECT gen_random_uuid(), CAST(:user_id AS uuid), :crew_id, '{}'::json,
+           CASE WHEN n % 50 = 0 THEN 'RUNNING' ELSE 'COMPLETED' END,
+           now() - make_interval(secs => n),
+           now() - make_interval(secs => n) + interval '1 minute'
+    FROM generate_series(1, :rows) AS n
+""")
+
+
+async def seed(rows: int) -> uuid.UUID:
+    async with AsyncSessionLocal() as db:
+        crew_id = await db.scalar(select(Crew.id).limit(1))
+        if crew_id is None:
+            raise SystemExit("No crews in the database; seed them first")
+        user = User(id=uuid.uuid4(), email=f"bench-{uuid.uuid4().hex[:8]}@example.com", hashed_password="x", credits=0)
+        db.add(user)
+        await db.flush()
+        start = time.perf_counter()
+        await db.execute(SEED_SQL, {"user_id": str(user.id), "crew_id": crew_id, "rows": rows})
+        await db.commit()
+        print(f"seeded {rows:,} runs in {time.perf_counter() - start:.0f}s")
+    async with async_engine.connect() as conn:
+        await conn.execute(text("ANALYZE crew_runs"))
+    return user.id
+
+
+async def drop(user_id: uuid.UUID):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(CrewRun).where(CrewRun.user_id == user_id))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+
+async def time_keyset(user_id, page: int, page_size: int, repeats: int, status=None):
+    # Walk to the page once to find its cursor, as a client paging through would have
+    async with AsyncSessionLocal() as db:
+        offset_row = await db.execute(
+            select(CrewRun.created_at, CrewRun.id)
+            .filter(CrewRun.user_id == user_id)
+            .order_by(CrewRun.created_at.desc(), CrewRun.id.desc())
+            .offset(page * page_size - 1).limit(1)
+        ) if page else None
+        before = tuple(offset_row.one()) if offset_row else None
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            await get_user_crew_runs(db, user_id, page_size + 1, before=before, status=status)
+            timings.append((time.perf_counter() - start) * 1000)
+            db.expunge_all()
+    return statistics.median(timings)
+
+
+async def time_offset(user_id, page: int, page_size: int, repeats: int):
+    async with AsyncSessionLocal() as db:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            await db.execute(
+                select(CrewRun)
+                .filter(CrewRun.user_id == user_id)
+                .order_by(CrewRun.created_at.desc(), CrewRun.id.desc())
+                .offset(page * page_size).limit(page_size + 1)
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+            db.expunge_all()
+    return statistics.median(timings)
+
+
+async def main(args):
+    user_id = uuid.UUID(args.user_id) if args.user_id else await seed(args.rows)
+    try:
+        max_page = args.rows // args.page_size - 1
+        pages = [page for page in (0, 10, 1000, 10000, 100000, 500000) if page <= max_page]
+        print(f"{'page':>8} {'keyset ms':>10} {'offset ms':>10}")
+        for page in pages:
+            keyset_ms = await time_keyset(user_id, page, args.page_size, args.repeats)
+            offset_ms = await time_offset(user_id, page, args.page_size, args.repeats)
+            print(f"{page:>8} {keyset_ms:10.2f} {offset_ms:10.2f}")
+        active_ms = await time_keyset(user_id, 0, args.page_size, args.repeats, status="active")
+        print(f"active runs, first page: {active_ms:.2f} ms")
+    finally:
+        if args.keep:
+            print(f"kept seeded runs for --user-id {user_id}")
+        else:
+            await drop(user_id)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--user-id", help="Reuse runs seeded by an earlier --keep run (pass the same --rows)")
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded runs in place")
+    asyncio.run(main(parser.parse_args()))
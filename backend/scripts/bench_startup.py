@@ -0,0 +1,63 @@
+"""Compare API import time and memory with lazy vs eagerly imported crews.
+
+Each case runs in a fresh interpreter with python -X importtime:
+
+    cd backend && python scripts/bench_startup.py --top 10
+
+"lean" imports app.main the way an API process does. "eager" also resolves
+every crew class, which is what importing the crews at module load used to
+cost (and what worker processes now do up front).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "lean": "import app.main",
+    "eager": "import app.main; from app.services.crew_runner import crew_runner; crew_runner.preload()",
+}
+
+REPORT = "; import resource, sys; print('RSS_KB', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)"
+
+
+def run_case(code: str):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code + REPORT],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None, None, []
+    rss_kb = None
+    imports = []
+    for line in result.stderr.splitlines():
+        if line.startswith("RSS_KB"):
+            rss_kb = int(line.split()[1])
+        elif line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                imports.append((int(cumulative), name.rstrip()))
+    # Top-level imports are the ones without leading indentation in the name column
+    total_us = sum(us for us, name in imports if not name.startswith("  "))
+    return total_us, rss_kb, sorted(imports, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per case")
+    args = parser.parse_args()
+
+    for label, code in CASES.items():
+        total_us, rss_kb, imports = run_case(code)
+        if total_us is None:
+            print(f"{label:>6}: failed to import (are the crew dependencies installed?)")
+            continue
+        print(f"{label:>6}: imports {total_us / 1000:.0f} ms, max RSS {rss_kb / 1024:.1f} MB")
+        for us, name in imports[:args.top]:
+            print(f"          {us / 1000:8.1f} ms  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
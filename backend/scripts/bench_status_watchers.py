@@ -0,0 +1,106 @@
+"""Count database transactions per minute while many clients watch one run.
+
+Compares three ways of waiting for a run: polling GET /crews/runs/{id} every
+--poll-interval seconds, long-polling it with ?wait=, and the SSE stream. Run
+against a live backend with no worker draining the queue (RUN_EMBEDDED_WORKER=false
+and no app.worker), so the watched run stays PENDING and nothing changes, which
+is what most watchers see most of the time. DATABASE_URL must point at the
+backend's Postgres; transactions are read from pg_stat_database:
+
+    cd backend && python scripts/bench_status_watchers.py --watchers 1000 --duration 60
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+from app.db.session import async_engine  # noqa: E402
+
+XACT_SQL = text(
+    "SELECT xact_commit + xact_rollback FROM pg_stat_database WHERE datname = current_database()"
+)
+
+
+async def transactions() -> int:
+    async with async_engine.connect() as conn:
+        # Statistics are flushed lazily; clear this backend's snapshot so the count is current
+        await conn.execute(text("SELECT pg_stat_clear_snapshot()"))
+        return await conn.scalar(XACT_SQL)
+
+
+async def poll(client, url, interval, stop):
+    while not stop.is_set():
+        await client.get(url)
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def long_poll(client, url, wait, stop):
+    while not stop.is_set():
+        await client.get(url, params={"wait": wait}, timeout=wait + 30)
+
+
+async def sse(client, url, stop):
+    async with client.stream("GET", url, timeout=None) as response:
+        async for _ in response.aiter_lines():
+            if stop.is_set():
+                break
+
+
+async def measure(label, make_watcher, watchers, duration):
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(make_watcher(stop)) for _ in range(watchers)]
+    # Let every watcher connect before counting
+    await asyncio.sleep(2)
+    before = await transactions()
+    await asyncio.sleep(duration)
+    after = await transactions()
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    per_minute = (after - before) * 60 / duration
+    print(f"{label:>10}: {per_minute:10,.0f} DB transactions/min with {watchers} watchers")
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.watchers + 10, max_keepalive_connections=args.watchers + 10)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        email = f"watch-{uuid.uuid4().hex[:8]}@example.com"
+        body = {"email": email, "password": "watch-password"}
+        await client.post("/api/v1/auth/signup", json=body)
+        token = (await client.post("/api/v1/auth/token", json=body)).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        run = (await client.post(f"/api/v1/crews/{args.crew_id}/run", json={"inputs": {"topic": "watchers"}})).json()
+        status_url = f"/api/v1/crews/runs/{run['id']}"
+
+        cases = {
+            "poll": lambda stop: poll(client, status_url, args.poll_interval, stop),
+            "long-poll": lambda stop: long_poll(client, status_url, args.wait, stop),
+            "sse": lambda stop: sse(client, f"{status_url}/events", stop),
+        }
+        started = time.perf_counter()
+        for label, make_watcher in cases.items():
+            await measure(label, make_watcher, args.watchers, args.duration)
+        print(f"done in {time.perf_counter() - started:.0f}s")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--crew-id", type=int, default=3)
+    parser.add_argument("--watchers", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds measured per mode")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--wait", type=float, default=30.0, help="?wait= for the long-poll mode")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""Benchmark the search/scrape tool cache against a local stand-in for Serper and websites.
+
+Starts a slow local HTTP server that imitates the Serper search API and a few
+web pages, then fires concurrent identical tool calls with and without the cache:
+
+    cd backend && python scripts/bench_tool_cache.py --concurrency 50
+
+Exits non-zero if concurrent identical calls reach the upstream more than once.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crewai_tools import SerperDevTool, ScrapeWebsiteTool  # noqa: E402
+from app.core.cached_tools import CachedSerperDevTool, CachedScrapeWebsiteTool, tool_cache  # noqa: E402
+
+upstream_calls = {"search": 0, "page": 0}
+counter_lock = threading.Lock()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self._count("search")
+        organic = [{"title": f"Result {i}", "link": f"https://example.com/{i}", "snippet": "..."} for i in range(10)]
+        self._reply("application/json", json.dumps({"organic": organic}).encode())
+
+    def do_GET(self):
+        self._count("page")
+        self._reply("text/html", b"<html><body><h1>Market report</h1><p>Lots of content.</p></body></html>")
+
+    def _count(self, kind):
+        with counter_lock:
+            upstream_calls[kind] += 1
+        time.sleep(self.latency)
+
+    def _reply(self, content_type, payload):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label, search_tool, scrape_tool, base_url, concurrency):
+    upstream_calls.update(search=0, page=0)
+
+    def call(index):
+        # Same topic, differently spelled, as concurrent runs would produce
+        search_tool._run(search_query="AI market trends" if index % 2 else "  ai MARKET trends ")
+        scrape_tool._run(website_url=f"{base_url}/report/" if index % 2 else f"{base_url}/report#summary")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:>9}: {concurrency} concurrent runs -> {upstream_calls['search']} searches, "
+          f"{upstream_calls['page']} page fetches upstream in {elapsed:.2f}s")
+    return dict(upstream_calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stand-in response time in seconds")
+    args = parser.parse_args()
+
+    StandInHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault("SERPER_API_KEY", "stand-in")
+
+    run("uncached", SerperDevTool(search_url=f"{base_url}/search"), ScrapeWebsiteTool(), base_url, args.concurrency)
+    cached = run("cached", CachedSerperDevTool(search_url=f"{base_url}/search"), CachedScrapeWebsiteTool(),
+                 base_url, args.concurrency)
+    run("warm", CachedSerperDevTool(search_url=f"{base_url}/search"), CachedScrapeWebsiteTool(),
+        base_url, args.concurrency)
+    print("cache:", tool_cache.stats())
+    server.shutdown()
+
+    if cached["search"] != 1 or cached["page"] != 1:
+        print("FAIL: identical concurrent calls were not deduplicated")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Compare encode cost and bytes per run for the JSON and compact wire formats.
+
+Builds a synthetic run shaped like the bundled crews (agent/tool events, a
+stream of llm_chunk frames and a final result) and encodes it repeatedly:
+
+    cd backend && python scripts/bench_wire_protocol.py --runs 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import wire_protocol  # noqa: E402
+
+
+def synthetic_run(chunks: int):
+    events = [
+        {"type": "agent_start", "agent": "Content Strategist", "task": "Planning blog post about: The Future of AI"},
+        {"type": "agent_action", "agent": "Content Strategist", "message": "Researching topic and planning strategy..."},
+        {"type": "tool_start", "tool": "SerperDevTool", "input": "Researching: The Future of AI"},
+        {"type": "tool_end", "tool": "SerperDevTool", "output": "Found trending topics and keywords"},
+        {"type": "agent_start", "agent": "Blog Writer", "task": "Writing the blog post..."},
+    ]
+    events += [{"type": "llm_chunk", "content": "the quick brown fox jumps over the lazy dog "} for _ in range(chunks)]
+    events += [
+        {"type": "agent_action", "agent": "Content Editor", "message": "Checking grammar and flow..."},
+        {"type": "complete", "result": "# The Future of AI\n\n" + "Lorem ipsum dolor sit amet. " * 200},
+    ]
+    for seq, event in enumerate(events, start=1):
+        event["seq"] = seq
+        event["timestamp"] = 12345.678 + seq * 0.03
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=300)
+    args = parser.parse_args()
+
+    events = synthetic_run(args.chunks)
+    results = {}
+    for protocol in (wire_protocol.JSON, wire_protocol.COMPACT):
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            total_bytes = sum(len(wire_protocol.encode(event, protocol).encode()) for event in events)
+        elapsed = time.perf_counter() - start
+        per_event_us = elapsed / (args.runs * len(events)) * 1e6
+        results[protocol] = (per_event_us, total_bytes)
+        print(f"{protocol:>20}: {per_event_us:.2f} us/event, {total_bytes} bytes/run ({len(events)} events)")
+
+    json_bytes = results[wire_protocol.JSON][1]
+    compact_bytes = results[wire_protocol.COMPACT][1]
+    streaming_json = sum(len(wire_protocol.encode(e, wire_protocol.JSON)) for e in events if e["type"] != "complete")
+    streaming_compact = sum(len(wire_protocol.encode(e, wire_protocol.COMPACT)) for e in events if e["type"] != "complete")
+    print(f"bytes saved: {100 * (1 - compact_bytes / json_bytes):.0f}% overall, "
+          f"{100 * (1 - streaming_compact / streaming_json):.0f}% excluding the final result")
+
+
+if __name__ == "__main__":
+    main()
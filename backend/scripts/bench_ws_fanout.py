@@ -0,0 +1,96 @@
+"""Measure WebSocket fan-out latency for one run with many subscribers.
+
+Runs entirely in-process against ConnectionManager with fake sockets, so no
+server is needed:
+
+    cd backend && python scripts/bench_ws_fanout.py --slow-fraction 0.1 --slow-delay 0.05
+
+For 1, 100 and 1000 subscribers it reports how long the producer spent in
+send_personal_message and the delivery latency seen by the fast subscribers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ws_manager import ConnectionManager  # noqa: E402
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.latencies = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.latencies.append(time.perf_counter() - json.loads(text)["sent"])
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    if not samples:
+        return 0.0
+    return samples[max(0, min(len(samples) - 1, int(round(pct / 100.0 * len(samples))) - 1))]
+
+
+async def run_case(subscribers, messages, slow_fraction, slow_delay, policy, queue_size):
+    manager = ConnectionManager(max_queue=queue_size, overflow_policy=policy)
+    await manager.start()
+    slow_count = int(subscribers * slow_fraction)
+    sockets = []
+    for index in range(subscribers):
+        ws = FakeWebSocket(slow_delay if index < slow_count else 0)
+        await manager.connect(ws, "bench")
+        sockets.append(ws)
+
+    producer_times = []
+    for index in range(messages):
+        start = time.perf_counter()
+        message = {"type": "llm_chunk", "content": f"chunk {index}", "sent": start}
+        await manager.send_personal_message(message, "bench")
+        producer_times.append(time.perf_counter() - start)
+        await asyncio.sleep(0.001)  # Roughly the pace of a streaming LLM
+
+    await asyncio.sleep(0.2)
+    fast_latencies = [lat for ws in sockets[slow_count:] for lat in ws.latencies]
+    remaining = len(manager.active_connections.get("bench", {}))
+    for ws in list(manager.active_connections.get("bench", {})):
+        manager.disconnect(ws, "bench")
+
+    ms = lambda value: value * 1000  # noqa: E731
+    print(f"{subscribers:>5} subscribers ({slow_count} slow): "
+          f"producer p99 {ms(percentile(producer_times, 99)):.3f} ms, "
+          f"fast delivery p50 {ms(percentile(fast_latencies, 50)):.2f} ms / "
+          f"p99 {ms(percentile(fast_latencies, 99)):.2f} ms, "
+          f"mean {ms(statistics.mean(fast_latencies)) if fast_latencies else 0:.2f} ms, "
+          f"still connected {remaining}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--slow-fraction", type=float, default=0.1)
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="Seconds per send for slow clients")
+    parser.add_argument("--policy", default="drop_oldest")
+    parser.add_argument("--queue-size", type=int, default=64)
+    args = parser.parse_args()
+
+    for subscribers in (1, 100, 1000):
+        await run_case(subscribers, args.messages, args.slow_fraction, args.slow_delay,
+                       args.policy, args.queue_size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
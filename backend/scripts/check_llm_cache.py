@@ -0,0 +1,96 @@
+"""Exercise the LLM response cache against a local fake OpenAI-compatible endpoint.
+
+Starts a tiny chat-completions server on localhost, points get_cerebras_llm at
+it and checks which calls reach the server:
+
+    cd backend && python scripts/check_llm_cache.py
+
+Exits non-zero if a cacheable call is not served from cache, or if a
+high-temperature call is.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+requests_seen = []
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        requests_seen.append(body)
+        reply = {
+            "id": f"chatcmpl-{len(requests_seen)}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"answer #{len(requests_seen)}"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+        payload = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    server = HTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    cache_dir = tempfile.mkdtemp()
+    os.environ["CEREBRAS_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["CEREBRAS_API_KEY"] = "test"
+    os.environ["LLM_CACHE_PATH"] = os.path.join(cache_dir, "llm_cache.sqlite")
+
+    from app.core import llm_cache
+    from app.core.cerebras_llm import get_cerebras_llm
+
+    failures = []
+
+    def check(condition, description):
+        print(("ok   " if condition else "FAIL ") + description)
+        if not condition:
+            failures.append(description)
+
+    llm = get_cerebras_llm()
+    first = llm.invoke("Write a haiku about caching").content
+    second = llm.invoke("Write a haiku about caching").content
+    check(len(requests_seen) == 1 and first == second, "repeated prompt is served from the memory tier")
+
+    llm.invoke("A different prompt")
+    check(len(requests_seen) == 2, "different prompt misses")
+
+    # A fresh process would only have the disk tier
+    llm_cache.get_llm_cache().memory.clear()
+    third = get_cerebras_llm().invoke("Write a haiku about caching").content
+    check(len(requests_seen) == 2 and third == first, "repeated prompt is served from the disk tier")
+
+    get_cerebras_llm(temperature=0.1).invoke("Write a haiku about caching")
+    check(len(requests_seen) == 3, "a different temperature is a different cache key")
+
+    hot = get_cerebras_llm(temperature=1.0)
+    hot.invoke("Write a haiku about caching")
+    hot.invoke("Write a haiku about caching")
+    check(len(requests_seen) == 5, "calls above LLM_CACHE_MAX_TEMPERATURE bypass the cache")
+
+    print("stats:", llm_cache.get_llm_cache().stats())
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
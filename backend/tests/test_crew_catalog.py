@@ -0,0 +1,38 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.models import Crew
+from app.services.crew_catalog import CrewCatalog
+
+
+async def _fetch_after_rollback():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Crew.__table__.create)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with sessions() as db:
+        db.add(Crew(
+            id=1,
+            name="Travel Planner",
+            description="Plans trips",
+            crew_identifier="travel_planner",
+            credits_required=3
+        ))
+        await db.commit()
+
+    catalog = CrewCatalog()
+    async with sessions() as db:
+        crew = await catalog.get_crew(db, 1)
+        # As on the insufficient-credits and idempotency-conflict paths
+        await db.rollback()
+        assert crew.credits_required == 3
+    async with sessions() as db:
+        crew = await catalog.get_crew(db, 1)
+        assert crew.credits_required == 3
+        assert crew.crew_identifier == "travel_planner"
+    await engine.dispose()
+
+
+def test_cached_crews_survive_a_rollback():
+    asyncio.run(_fetch_after_rollback())
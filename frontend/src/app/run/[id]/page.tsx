@@ -10,7 +10,7 @@ import LiveSynthesis from '@/components/LiveSynthesis';
 
 interface CrewRunStatus {
   id: string;
-  status: 'PENDING' | 'RUNNING' | 'COMPLETED' | 'FAILED';
+  status: 'PENDING' | 'RUNNING' | 'COMPLETED' | 'FAILED' | 'CANCELLED';
   output?: string;
   created_at: string;
   completed_at?: string;
@@ -62,6 +62,7 @@ export default function RunPage() {
       case 'COMPLETED':
         return <CheckCircle className="h-5 w-5 text-green-500" />;
       case 'FAILED':
+      case 'CANCELLED':
         return <AlertCircle className="h-5 w-5 text-red-500" />;
       case 'RUNNING':
         return <Clock className="h-5 w-5 text-blue-500 animate-spin" />;
@@ -18,6 +18,7 @@ interface LogEntry {
   output?: string;
   content?: string;
   error?: string;
+  reason?: string;
   timestamp: number;
 }
 
@@ -58,12 +59,17 @@ export default function LiveSynthesis({ runId }: LiveSynthesisProps) {
     wsRef.current.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
+        if (data.type === 'restart') {
+          // The run starts over on another worker; earlier events no longer apply
+          setLogs([]);
+          setIsComplete(false);
+        }
         addLog({
           id: Date.now().toString() + Math.random(),
           ...data,
         });
 
-        if (data.type === 'complete' || data.type === 'error') {
+        if (data.type === 'complete' || data.type === 'error' || data.type === 'cancelled') {
           setIsComplete(true);
         }
       } catch (error) {
@@ -113,6 +119,7 @@ export default function LiveSynthesis({ runId }: LiveSynthesisProps) {
       case 'complete':
         return <CheckCircle className="h-4 w-4 text-green-500" />;
       case 'error':
+      case 'cancelled':
         return <XCircle className="h-4 w-4 text-red-500" />;
       case 'system':
         return <Clock className="h-4 w-4 text-gray-500" />;
@@ -134,6 +141,7 @@ export default function LiveSynthesis({ runId }: LiveSynthesisProps) {
       case 'complete':
         return 'border-l-green-500 bg-green-100';
       case 'error':
+      case 'cancelled':
         return 'border-l-red-500 bg-red-50';
       default:
         return 'border-l-gray-500 bg-gray-50';
@@ -156,7 +164,10 @@ export default function LiveSynthesis({ runId }: LiveSynthesisProps) {
         return `🎉 Execution completed successfully!`;
       case 'error':
         return `❌ Error: ${entry.error}`;
+      case 'cancelled':
+        return `⛔ Run cancelled (${entry.reason})`;
       case 'system':
+      case 'restart':
         return `ℹ️ ${entry.message}`;
       default:
         return entry.message || 'Unknown event';